@@ -1,5 +1,4 @@
 import pandas as pd
-import ollama
 import json
 import time
 from difflib import SequenceMatcher
@@ -8,16 +7,21 @@ from tkinter import filedialog, Tk
 import os
 from sentence_transformers import SentenceTransformer
 from archieve.utils import load_faiss_index
+from utils.keyword_matcher import ProductPostings, QUESTION_MATCHER
+from utils.stats import compute_stats, summarize
+from utils.llm_backends import build_router
 
 
-# 初始化 Ollama 客戶端
-client = ollama.Client()
+# 初始化模型後端（預設 Ollama llama3；可用 CESTLAVIE_LLM_BACKENDS / OLLAMA_HOST 改接其他後端或測試伺服器）
+llm = build_router(os.getenv("CESTLAVIE_LLM_BACKENDS", "ollama").split(","),
+                   ollama_model=os.getenv("CESTLAVIE_OLLAMA_MODEL", "llama3"))
 
 # 全域變數存放資料
 json_file_path = None
 df = None
 summary = None
 documents = None
+postings = None
 
 # 建立模型
 model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
@@ -65,9 +69,10 @@ def load_json():
     if file_path:
         df = load_data(file_path)
         if df is not None:
-            global documents, index2, docs, embedding_model
+            global documents, index2, docs, embedding_model, postings
             json_file_path = file_path
-            summary = df.describe(include='all').to_string()
+            summary = summarize(compute_stats(df))  # 取代 describe(include='all')，只算一次
+            postings = ProductPostings(df)  # 產品名稱 → 列索引，篩選不必每次掃描全表
             print("✅ 資料摘要已生成！")
             documents = df_to_documents(df)
            
@@ -93,20 +98,24 @@ def load_json():
 
 
 def filter_df_by_question(df, question, product_list): #產品關鍵字提取
-    for name in product_list:
-        if name in question:
-            filtered = df[df["產品名稱"].str.contains(name, na=False)]
-            print(f"偵測到產品名稱：{name}，共 {len(filtered)} 筆")
-           # print(filtered.head(0).to_string(index=False))  # 列印出篩選結果
-            return filtered, name
+    # product_list 已編進 postings 的比對器，保留參數以相容舊呼叫
+    global postings
+    if postings is None or postings.df is not df:
+        postings = ProductPostings(df)
+    names = postings.match(question)
+    if names:
+        filtered = postings.take(names)
+        print(f"偵測到產品名稱：{'、'.join(names)}，共 {len(filtered)} 筆")
+       # print(filtered.head(0).to_string(index=False))  # 列印出篩選結果
+        return filtered, "、".join(names)
 
     return df.head(10000), None  
 
 def extract_keyword(question): #問題關鍵字提取
-    for name in question_list:
-        if name in question:
-            print(f"偵測到問題關鍵字：{name}")
-            return name
+    keywords = QUESTION_MATCHER.find(question)
+    if keywords:
+        print(f"偵測到問題關鍵字：{'、'.join(keywords)}")
+        return keywords[0]
     return None
 
 
@@ -166,15 +175,10 @@ def generate_prompts(question):
 
 def generate_answer(system_prompt, user_prompt):
     try:
-        response = client.chat(
-            model="llama3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            stream=True
-        )
-        raw = ''.join([chunk["message"]["content"] for chunk in response])
+        raw = llm.complete([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ])
         
         # 如果包含英文，自動翻譯
         if contains_english(raw):
@@ -8,22 +8,8 @@ import re
 from sentence_transformers import SentenceTransformer
 import faiss
 import pickle
-
-# 所有產品名稱（來自你圖片）
-product_list = [
-    "奶油波士頓", "奶波", "玉芙蓉", "冰花", "貝比萵", "紅火焰", "紅奶油",
-    "紅狐", "紅彤", "紅橙", "紅甜脆", "紅芽心", "紅綠",
-    "英貝比萵", "英貝比萵(不分品種)", "恐龍甘藍", "恐龍羽衣甘藍", "粉嫩天使",
-    "捲葉甘藍", "捲葉羽衣甘藍", "菊苣", "試種", "綠水晶", "綠火焰",
-    "綠狐", "綠甜脆", "綠橡","綠蘿蔓","綠寶石"
-]
-
-question_list = [ "產品名稱","產品編號", "種植日期", "採收日期", "狀態","多少顆","多少斤","多少公斤",
-                 "多少公克","多少片","多少株","多少棵","多少株數","多少片數","多少斤數","多少公斤數","多少公克數",
-                 "最多","最少","平均","中位數","標準差","變異數","最大值","最小值",
-                 "總和","總計","總數","總量","總重量","總斤數","總公斤數","總公克數",
-                 "價格","單價","售價"
-]
+from utils import schema
+from utils.vocabulary import product_list, question_list  # 共用詞彙表，聊天快速回答也會用到
 
 
 # 讀取 JSON 檔案（手動選擇）
@@ -48,39 +34,20 @@ def load_data(file_path):
         with open(file_path, "r", encoding="utf-8") as file:
             json_data = json.load(file)
 
-        required_columns = ["產品編號", "產品名稱", "種植日期", "採收日期", "狀態"]
         if "Sheet1" not in json_data:
             raise ValueError("❌ JSON 格式錯誤: 找不到 'Sheet1'")
 
-        valid_records = []
-        invalid_count = 0
-
-        for record in json_data["Sheet1"]:
-            # 確保欄位都存在
-            if all(col in record for col in required_columns):
-                # 確保欄位內容不是 None、空字串或 NaN
-                if all(
-                    record[col] not in [None, ""] and not pd.isna(record[col])
-                    for col in required_columns
-                ):
-                    valid_records.append(record)
-                else:
-                    invalid_count += 1
-            else:
-                invalid_count += 1
-
-        if not valid_records:
+        # 欄位檢查與型別轉換（向量化，依原因統計排除筆數）
+        df, invalid = schema.validate(pd.DataFrame.from_records(json_data["Sheet1"]))
+
+        if df.empty:
             raise ValueError("❌ 沒有符合要求的資料記錄")
 
-        print(f"✅ 成功載入 {len(valid_records)} 筆有效資料")
-        if invalid_count > 0:
-            print(f"⚠️ 排除 {invalid_count} 筆含空值或不完整的資料")
+        print(f"✅ 成功載入 {len(df)} 筆有效資料")
+        if any(invalid.values()):
+            print(f"⚠️ 排除 {sum(invalid.values())} 筆資料：{schema.format_invalid_counts(invalid)}")
 
-        # 轉成 DataFrame
-        df = pd.DataFrame(valid_records)
-        df["種植日期"] = pd.to_datetime(df["種植日期"])
-        df["採收日期"] = pd.to_datetime(df["採收日期"])
-        df["種植時間（日）"] = (df["採收日期"] - df["種植日期"]).dt.days
+        schema.add_derived_columns(df)
 
         return df
 
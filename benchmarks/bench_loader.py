@@ -0,0 +1,74 @@
+"""Streaming loader vs the original `json.load` loader: wall time and peak memory.
+
+    python -m benchmarks.bench_loader --rows 1000000
+    python -m benchmarks.bench_loader --source Data/merged_product_data_sorted_json.json
+
+Each loader runs in its own process, after the same imports, so the peak
+RSS of one doesn't hide the other's. The "imports only" row is the floor.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIRED_COLUMNS = ["產品編號", "產品名稱", "種植日期", "採收日期", "狀態"]
+
+
+def load_original(file_path):
+    """The loader before streaming: the whole document, then a list of dicts, then the frame."""
+    import pandas as pd
+    with open(file_path, "r", encoding="utf-8") as file:
+        json_data = json.load(file)
+    valid_records = [record for record in json_data["Sheet1"] if all(col in record for col in REQUIRED_COLUMNS)]
+    df = pd.DataFrame(valid_records)
+    df["種植日期"] = pd.to_datetime(df["種植日期"])
+    df["採收日期"] = pd.to_datetime(df["採收日期"])
+    df["種植時間（日）"] = (df["採收日期"] - df["種植日期"]).dt.days
+    return df
+
+
+def _child(mode, source):
+    from utils.data_loader import _build_frame, iter_sheet1_records
+    from utils.memory import peak_memory
+
+    started = time.perf_counter()
+    if mode == "original":
+        df = load_original(source)
+    elif mode == "streamed":
+        df, _, _ = _build_frame(iter_sheet1_records(source))
+    else:
+        df = ()
+    seconds = time.perf_counter() - started
+    frame_mb = df.memory_usage(deep=True).sum() / (1 << 20) if len(df) else 0
+    print(f"{len(df)},{seconds:.2f},{peak_memory() / (1 << 20):.0f},{frame_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--source", help="existing export to use instead of a synthetic one")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    from benchmarks.synthetic import write_export
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source or write_export(os.path.join(tmp, "export.json"), args.rows)
+        print(f"source: {os.path.getsize(source) / (1 << 20):.0f} MB")
+        print(f"{'loader':<22}{'rows':>10}{'seconds':>10}{'peak RSS MB':>14}{'frame MB':>10}")
+        for mode, label in (("imports", "imports only"), ("original", "json.load (original)"),
+                            ("streamed", "streamed")):
+            output = subprocess.run([sys.executable, "-m", "benchmarks.bench_loader", "--child", mode, source],
+                                    cwd=ROOT, check=True, capture_output=True, text=True).stdout
+            rows, seconds, peak, frame = output.strip().splitlines()[-1].split(",")
+            print(f"{label:<22}{rows:>10}{float(seconds):>10.2f}{float(peak):>14.0f}{float(frame):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""SQLite store vs the in-memory frame: build cost, peak memory and query latency.
+
+    python -m benchmarks.bench_sqlite --rows 1000000
+    python -m benchmarks.bench_sqlite --rows 10000000 --repeat 5
+
+Each build runs in its own process so its peak RSS is measured alone.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child(mode, source, db_path):
+    from utils.data_loader import _build_frame, iter_source_records
+    from utils.sqlite_store import ingest_source
+    from utils.memory import peak_memory
+
+    started = time.perf_counter()
+    if mode == "frame":
+        df, _, _ = _build_frame(iter_source_records(source))
+        rows = len(df)
+    else:
+        rows = ingest_source(source, db_path).count()
+    print(f"{mode},{rows},{time.perf_counter() - started:.2f},{peak_memory() / (1 << 20):.0f}")
+
+
+def _measure(mode, source, db_path):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_sqlite", "--child", mode, source, db_path],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    _, rows, seconds, peak = output.strip().splitlines()[-1].split(",")
+    return int(rows), float(seconds), float(peak)
+
+
+def _timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--source", help="existing export to use instead of a synthetic one")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    from benchmarks.synthetic import write_export
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source or write_export(os.path.join(tmp, "export.json"), args.rows)
+        db_path = os.path.join(tmp, "products.sqlite")
+        print(f"{'build':<24}{'rows':>12}{'seconds':>10}{'peak RSS MB':>14}")
+        for mode, label in (("frame", "pandas frame"), ("sqlite", "SQLite ingest (streamed)")):
+            rows, seconds, peak = _measure(mode, source, db_path)
+            print(f"{label:<24}{rows:>12}{seconds:>10.2f}{peak:>14.0f}")
+        print(f"SQLite file: {os.path.getsize(db_path) / (1 << 20):.0f} MB on disk\n")
+
+        from utils.data_loader import _build_frame, iter_source_records
+        from utils.sqlite_store import ProductStore
+        df, _, _ = _build_frame(iter_source_records(source))
+        store = ProductStore(db_path)
+        name = str(df["產品名稱"].value_counts().index[0])
+        product_id = int(df["產品編號"].iloc[0])
+        queries = [
+            ("count one product", lambda: int((df["產品名稱"] == name).sum()),
+             lambda: store.count(products=[name])),
+            ("top products", lambda: df["產品名稱"].value_counts(),
+             lambda: store.value_counts("產品名稱")),
+            ("names for one id", lambda: df.loc[df["產品編號"] == product_id, "產品名稱"].value_counts(),
+             lambda: store.value_counts("產品名稱", product_id=product_id)),
+            ("rows of one id", lambda: df[df["產品編號"] == product_id],
+             lambda: store.query(product_id=product_id)),
+        ]
+        print(f"{'query (ms)':<24}{'pandas':>10}{'SQLite':>10}")
+        for label, in_memory, in_sqlite in queries:
+            print(f"{label:<24}{_timed(in_memory, args.repeat):>10.2f}{_timed(in_sqlite, args.repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Synthetic `Sheet1` JSON exports for the benchmarks.
+
+    python -m benchmarks.synthetic 1000000 /tmp/products-1m.json
+"""
+import sys
+import json
+import random
+import datetime
+from utils.vocabulary import product_list
+
+STATUSES = ["種植中", "已採收"]
+FIRST_DAY = datetime.date(2022, 3, 3)
+
+
+def records(rows, seed=0):
+    """`rows` random records shaped like the real export (about 1% missing 狀態)."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        planted = FIRST_DAY + datetime.timedelta(days=rng.randint(0, 1000))
+        record = {"產品編號": rng.randint(1000, 9000), "產品名稱": rng.choice(product_list),
+                  "種植日期": planted.isoformat(),
+                  "採收日期": (planted + datetime.timedelta(days=rng.randint(40, 70))).isoformat(),
+                  "狀態": rng.choice(STATUSES)}
+        if i % 97 == 0:
+            del record["狀態"]
+        yield record
+
+
+def write_export(path, rows, seed=0):
+    """Write a JSON export with `rows` records, one per line, without holding them in memory."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('{"Sheet1": [\n')
+        for i, record in enumerate(records(rows, seed)):
+            file.write((",\n" if i else "") + json.dumps(record, ensure_ascii=False))
+        file.write("\n]}\n")
+    return path
+
+
+if __name__ == "__main__":
+    write_export(sys.argv[2], int(sys.argv[1]))
@@ -1,86 +1,277 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-import seaborn as sns
+import plotly.graph_objects as go
+import pandas as pd
 from datetime import datetime
-import io
+import calendar
+from utils.cube import get_cube, build_cube, slice_months, rollup
+from utils.date_index import get_date_index
+from utils.sqlite_store import get_store, COLUMNS as STORE_COLUMNS
+from utils.stats import get_stats, month_days
+from utils.sketches import box_stats, distinct_ids, HLL_ERROR
+from utils.render_cache import cached_render, render_figure
+from utils.figures import FIGURES
+from utils.report import render_charts, build_zip, build_pdf
+from utils.trends import FREQUENCIES, TREND_POINTS, INTERACTIVE_POINTS, event_series, downsample, status_mix
+
+# Above this many x values the interactive custom chart uses WebGL markers instead of bars
+MAX_BARS = 200
+
+STANDARD_CHARTS = [
+    "各產品平均種植時間",
+    "各產品總數量統計",
+    "不同狀態的產品分布",
+    "各產品種植時間分佈（箱型圖）",
+    "種植與採收趨勢",
+    "狀態比例趨勢",
+]
+
+
+def _product_values(cells, chart_option):
+    """Per-product bar values, title and y label for the two product bar charts."""
+    if chart_option == "各產品平均種植時間":
+        return rollup(cells, "產品名稱")["mean_days"], "📈 各產品平均種植時間（日）", "種植時間（日）"
+    counts = rollup(cells, "產品名稱")["count"].sort_values(ascending=False)
+    return counts, "📊 各產品總數量統計", "數量"
+
+
+def _boxes(df, start_date, end_date):
+    """Box statistics per product from the per-month day histograms, ordered by median."""
+    days = month_days(get_stats(df), start_date, end_date)
+    boxes = [box_stats(days.xs(name, level="產品名稱"), name)
+             for name in days.index.get_level_values("產品名稱").unique()]
+    return sorted(boxes, key=lambda box: box["med"])
+
+
+def _trend(df, start_date, end_date, period, products, points):
+    """Plantings and harvests per period, resampled from the count tables and downsampled to `points`."""
+    stats = get_stats(df)
+    return [(label, downsample(event_series(stats, event, start_date, end_date, FREQUENCIES[period], products), points))
+            for event, label in (("planted", "種植"), ("harvested", "採收"))]
+
+
+def _figure_spec(df, cells, start_date, end_date, chart_option, period="日", products=()):
+    """(figure name, args) for a standard chart; the args are small aggregates, picklable for workers."""
+    if chart_option in ("各產品平均種植時間", "各產品總數量統計"):
+        return "bar", _product_values(cells, chart_option)
+    if chart_option == "不同狀態的產品分布":
+        return "pie", (rollup(cells, "狀態")["count"],)
+    if chart_option == "各產品種植時間分佈（箱型圖）":
+        return "box", (_boxes(df, start_date, end_date),)
+    if chart_option == "種植與採收趨勢":
+        return "trend", (_trend(df, start_date, end_date, period, list(products), TREND_POINTS), period)
+    return "status_mix", (status_mix(cells),)
+
+
+def _chart_key(df, start_date, end_date, chart_option):
+    return (df.attrs.get("data_version"), start_date, end_date, chart_option)
+
+
+def _trend_key(key, period="日", products=()):
+    return (*key, period, tuple(products))
+
 
 def chart_analytics_ui(df):
     if df is None or df.empty:
         st.warning("⚠️ 沒有可分析的資料。")
         return
 
-    # Chinese font settings
-    plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-    plt.rcParams['axes.unicode_minus'] = False
-
     st.markdown("### 🕓 時間範圍篩選")
-    min_date = df["種植日期"].min()
-    max_date = df["採收日期"].max()
+    # Built-in charts answer from the pre-aggregated cube, so their cost doesn't grow with row count
+    cube = get_cube(df)
+    index = get_date_index(df)
+    min_date, max_date = index.bounds["planting_min"], index.bounds["harvest_max"]
 
-    col1, col2 = st.columns(2)
-    with col1:
-        start_year = st.selectbox("起始年份", list(range(min_date.year, max_date.year + 1)), index=0)
-        start_month = st.selectbox("起始月份", list(range(1, 13)), index=0)
-    with col2:
-        end_year = st.selectbox("結束年份", list(range(start_year, max_date.year + 1)), index=max_date.year - start_year)
-        end_month = st.selectbox("結束月份", list(range(1, 13)), index=11)
+    if st.toggle("以日期精確篩選", value=False):
+        picked = st.date_input("日期範圍（種植日起～採收日止）", value=(min_date.date(), max_date.date()),
+                               min_value=min_date.date(), max_value=max_date.date())
+        if len(picked) != 2:
+            st.info("請選擇結束日期")
+            return
+        start_date, end_date = (datetime.combine(day, datetime.min.time()) for day in picked)
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            start_year = st.selectbox("起始年份", list(range(min_date.year, max_date.year + 1)), index=0)
+            start_month = st.selectbox("起始月份", list(range(1, 13)), index=0)
+        with col2:
+            end_year = st.selectbox("結束年份", list(range(start_year, max_date.year + 1)), index=max_date.year - start_year)
+            end_month = st.selectbox("結束月份", list(range(1, 13)), index=11)
 
-    start_date = datetime(start_year, start_month, 1)
-    end_date = datetime(end_year, end_month, 28)
+        start_date = datetime(start_year, start_month, 1)
+        end_date = datetime(end_year, end_month, calendar.monthrange(end_year, end_month)[1])
 
-    filtered_df = df[(df["種植日期"] >= start_date) & (df["採收日期"] <= end_date)]
+    month_aligned = start_date.day == 1 and end_date.day == calendar.monthrange(end_date.year, end_date.month)[1]
+    if month_aligned:
+        cells = slice_months(cube, start_date, end_date)
+    else:
+        # Day-level range: binary-search the sorted frame, then aggregate just that slice
+        cells = build_cube(index.select(start_date, end_date))
 
-    if filtered_df.empty:
+    if cells["count"].sum() == 0:
         st.warning("⚠️ 所選時間範圍內沒有資料")
         return
 
-    chart_option = st.selectbox("請選擇要產生的圖表：", [
-        "各產品平均種植時間",
-        "各產品總數量統計",
-        "不同狀態的產品分布",
-        "自定義圖表"
-    ])
+    chart_option = st.selectbox("請選擇要產生的圖表：", STANDARD_CHARTS + ["自定義圖表"])
+    # Plotly charts receive only the aggregated values; zoom and hover run in the browser
+    interactive = st.toggle("互動圖表（Plotly）", value=False)
+
+    # Rendered images are cached per (data version, range, chart, columns): repeat views skip drawing
+    key = _chart_key(df, start_date, end_date, chart_option)
 
     try:
         if chart_option == "不同狀態的產品分布":
-            status_counts = filtered_df["狀態"].value_counts()
-            fig, ax = plt.subplots()
-            ax.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%')
-            ax.set_title("🔄 不同狀態的產品分布")
-            st.pyplot(fig)
-            # export chart
-            export_chart_as_image(fig)
-        
+            status_counts = rollup(cells, "狀態")["count"]
+
+            def plot():
+                fig = go.Figure(go.Pie(labels=status_counts.index, values=status_counts.values))
+                return fig.update_layout(title="🔄 不同狀態的產品分布")
+            _show_chart(key, lambda: FIGURES["pie"](status_counts), plot if interactive else None)
+
+        elif chart_option == "種植與採收趨勢":
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                period = st.selectbox("時間粒度", list(FREQUENCIES))
+            with col2:
+                products = st.multiselect("產品（不選則為全部）", options=sorted(cells["產品名稱"].unique()))
+            key = _trend_key(key, period, products)
+
+            def plot():
+                # WebGL lines keep client-side zooming smooth with a larger point budget
+                fig = go.Figure([go.Scattergl(x=series.index, y=series.values, mode="lines", name=label)
+                                 for label, series in _trend(df, start_date, end_date, period, products,
+                                                             INTERACTIVE_POINTS)])
+                return fig.update_layout(title=f"📈 每{period}種植與採收數量", xaxis_title="日期", yaxis_title="數量")
+            _show_chart(key, lambda: FIGURES["trend"](_trend(df, start_date, end_date, period, products,
+                                                             TREND_POINTS), period),
+                        plot if interactive else None)
+
+        elif chart_option == "狀態比例趨勢":
+            shares = status_mix(cells)
+
+            def plot():
+                fig = go.Figure([go.Scatter(x=shares.index, y=shares[status] * 100, name=str(status),
+                                            mode="lines", stackgroup="status", line_shape="hv")
+                                 for status in shares.columns])
+                return fig.update_layout(title="🔄 各種植月份的狀態比例", xaxis_title="種植月份",
+                                         yaxis_title="比例（%）", yaxis_range=[0, 100])
+            _show_chart(key, lambda: FIGURES["status_mix"](shares), plot if interactive else None)
+
+        elif chart_option == "各產品種植時間分佈（箱型圖）":
+            # Quartiles come from the per-month day histograms, so no rows are scanned
+            boxes = _boxes(df, start_date, end_date)
+            if not boxes:
+                st.warning("⚠️ 所選月份內沒有種植資料")
+                return
+
+            def plot():
+                # Precomputed quartiles: plotly draws the boxes without the underlying rows
+                fig = go.Figure(go.Box(
+                    x=[box["label"] for box in boxes], q1=[box["q1"] for box in boxes],
+                    median=[box["med"] for box in boxes], q3=[box["q3"] for box in boxes],
+                    lowerfence=[box["whislo"] for box in boxes], upperfence=[box["whishi"] for box in boxes],
+                    mean=[box["mean"] for box in boxes], name="種植時間（日）"))
+                return fig.update_layout(title="📦 各產品種植時間分佈", xaxis_title="產品名稱",
+                                         yaxis_title="種植時間（日）")
+            _show_chart(key, lambda: FIGURES["box"](boxes), plot if interactive else None)
+            month_range = (pd.Timestamp(start_date).to_period("M").to_timestamp(),
+                           pd.Timestamp(end_date).to_period("M").to_timestamp())
+            ids = distinct_ids(get_stats(df)["id_hll"], products=[box["label"] for box in boxes], months=month_range)
+            st.dataframe(pd.DataFrame({
+                "筆數": [box["count"] for box in boxes],
+                "中位數（日）": [box["med"] for box in boxes],
+                "四分位距（日）": [f"{box['q1']}–{box['q3']}" for box in boxes],
+                "不同產品編號數（估計）": [ids.get(box["label"]) for box in boxes],
+            }, index=[box["label"] for box in boxes]), use_container_width=True)
+            st.caption(f"依種植月份篩選；四分位數為精確值，不同產品編號數為 HyperLogLog 估計（標準誤差約 ±{HLL_ERROR:.1%}）")
+
+        elif chart_option == "自定義圖表":
+            # Column choices come from the schema, so a cached view needs no row filtering
+            x_col = st.selectbox("選擇 X 軸欄位", options=df.columns)
+            y_col = st.selectbox("選擇 Y 軸欄位", options=df.select_dtypes(include='number').columns)
+            key = (*key, x_col, y_col)
+
+            def filtered_rows():
+                # Arbitrary column pairs can't come from the cube: filter the rows
+                store = get_store(df)
+                if store is not None and {x_col, y_col} <= set(STORE_COLUMNS):
+                    return store.query(columns=list(dict.fromkeys([x_col, y_col])),
+                                       planted_from=start_date, harvested_to=end_date)
+                return index.select(start_date, end_date)
+
+            def plot():
+                # Same mean-per-x aggregate the bar chart shows; many x values switch to WebGL markers
+                means = filtered_rows().groupby(x_col, observed=True)[y_col].mean()
+                if len(means) > MAX_BARS:
+                    trace = go.Scattergl(x=means.index, y=means.values, mode="markers")
+                else:
+                    trace = go.Bar(x=means.index.astype(str), y=means.values)
+                return go.Figure(trace).update_layout(title=f"📊 {x_col} vs {y_col}", xaxis_title=x_col,
+                                                      yaxis_title=f"{y_col}（平均）")
+            _show_chart(key, lambda: FIGURES["custom"](filtered_rows(), x_col, y_col),
+                        plot if interactive else None)
+
         else:
-            fig = plt.figure(figsize=(10, 5))
-            if chart_option == "各產品平均種植時間":
-                sns.barplot(data=filtered_df, x="產品名稱", y="種植時間（日）", estimator='mean', errorbar=None)
-                plt.title("📈 各產品平均種植時間（日）")
-            elif chart_option == "各產品總數量統計":
-                counts = filtered_df["產品名稱"].value_counts()
-                sns.barplot(x=counts.index, y=counts.values)
-                plt.title("📊 各產品總數量統計")
-                plt.xlabel("產品名稱")
-                plt.ylabel("數量")
-            elif chart_option == "自定義圖表":
-                x_col = st.selectbox("選擇 X 軸欄位", options=filtered_df.columns)
-                y_col = st.selectbox("選擇 Y 軸欄位", options=filtered_df.select_dtypes(include=['int64', 'float64']).columns)
-                sns.barplot(data=filtered_df, x=x_col, y=y_col, estimator='mean', errorbar=None)
-                plt.title(f"📊 {x_col} vs {y_col}")
-
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            st.pyplot(fig)
-            # export chart
-            export_chart_as_image(fig)
+            values, title, y_label = _product_values(cells, chart_option)
+
+            def plot():
+                fig = go.Figure(go.Bar(x=values.index.astype(str), y=values.values))
+                return fig.update_layout(title=title, xaxis_title="產品名稱", yaxis_title=y_label)
+            _show_chart(key, lambda: FIGURES["bar"](values, title, y_label), plot if interactive else None)
 
     except Exception as e:
+        plt.close("all")
         st.error(f"❌ 圖表錯誤: {str(e)}")
-        
+
+    _report_export(df, cells, start_date, end_date)
+
+
+def _report_export(df, cells, start_date, end_date):
+    """Download every standard chart for the range as a ZIP of PNGs or a multi-page PDF.
+
+    Nothing is rendered until the button is clicked: the download data is a
+    callable, and the charts are drawn in parallel worker processes then.
+    """
+    with st.expander("📦 匯出所有圖表"):
+        fmt = st.radio("格式", ["ZIP（PNG）", "PDF"], horizontal=True)
+        span = f"{start_date:%Y%m%d}-{end_date:%Y%m%d}"
+
+        def build():
+            charts = []
+            for i, chart_option in enumerate(STANDARD_CHARTS, start=1):
+                key = _chart_key(df, start_date, end_date, chart_option)
+                if chart_option == "種植與採收趨勢":
+                    key = _trend_key(key)
+                if chart_option == "各產品種植時間分佈（箱型圖）" and not _boxes(df, start_date, end_date):
+                    continue
+                name, args = _figure_spec(df, cells, start_date, end_date, chart_option)
+                charts.append((key, f"{i:02d}-{chart_option}.png", name, args))
+            images = render_charts(charts)
+            return build_zip(images) if fmt.startswith("ZIP") else build_pdf(images)
+
+        is_zip = fmt.startswith("ZIP")
+        st.download_button("📥 下載報表", data=build, file_name=f"report-{span}.{'zip' if is_zip else 'pdf'}",
+                           mime="application/zip" if is_zip else "application/pdf")
+
+
+def _show_chart(key, draw, plot=None):
+    """Display a chart and its PNG download.
+
+    With `plot`, the chart is shown as an interactive Plotly figure; the PNG
+    download still comes from the matplotlib rendering in the render cache,
+    which is drawn only on a miss.
+    """
+    if plot is not None:
+        st.plotly_chart(plot(), use_container_width=True)
+        # Encoded only when the download is clicked
+        export_chart_as_image(lambda: cached_render(key, draw))
+    else:
+        png = cached_render(key, draw)
+        st.image(png)
+        export_chart_as_image(png)
+
 
 def export_chart_as_image(fig, filename="chart.png"):
-    
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches='tight')
-    buf.seek(0)
-    st.download_button("📥 下載圖表 (PNG)", data=buf, file_name=filename, mime="image/png")
+    """Download button for already-rendered PNG bytes, a callable producing them, or a figure."""
+    data = fig if isinstance(fig, bytes) or callable(fig) else render_figure(fig)
+    st.download_button("📥 下載圖表 (PNG)", data=data, file_name=filename, mime="image/png")
@@ -1,52 +1,139 @@
 # component/chat.py
+import os
+import time
 import streamlit as st
-from openai import OpenAI
 import pandas as pd
-
-# Use secrets for key (works locally + Streamlit Cloud)
-api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
-if not api_key:
-    st.error("❌ 找不到 OpenAI API Key。請在 .streamlit/secrets.toml 或環境變數中設定 `OPENAI_API_KEY`。")
-    st.stop()
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-def _summarize_df(df: pd.DataFrame, max_lines: int = 40) -> str:
-    """Compact DF summary to control token usage."""
+from utils.answer_engine import answer_question
+from utils.keyword_matcher import get_postings
+from utils.stats import get_stats, summarize
+from utils.answer_cache import answer_scope, answer_key, is_follow_up, get_answer_cache
+from utils.semantic_cache import get_semantic_cache
+from utils.context_builder import build_context, fold_turns
+from utils.stream_render import StreamRenderer, get_metrics_log
+from utils.scheduler import get_scheduler, current_scheduler, QueueFull
+
+TEMPERATURE = 0.2
+
+def _api_key():
+    """OpenAI key from secrets (works locally + Streamlit Cloud) or the environment."""
+    try:
+        key = st.secrets.get("OPENAI_API_KEY")
+    except FileNotFoundError:
+        key = None
+    return key or os.getenv("OPENAI_API_KEY")
+
+def _summarize_df(df: pd.DataFrame, question: str = "", max_lines: int = 40) -> str:
+    """Compact DF summary to control token usage, scoped to the products the question mentions."""
     if df is None or df.empty:
         return ""
-    desc = df.describe(include="all").astype(str).to_string()
-    lines = desc.splitlines()
-    return "\n".join(lines[:max_lines])
+    postings = get_postings(df)
+    products = postings.match(question)
+    if not products:
+        return _shared_summary(df.attrs.get("data_version"), df, max_lines)
+    names = [name for keyword in products for name in postings.names_for(keyword)]
+    return summarize(get_stats(df), products=names, max_lines=max_lines)
+
+@st.cache_resource(max_entries=4)
+def _shared_summary(data_version, _df: pd.DataFrame, max_lines: int = 40) -> str:
+    return summarize(get_stats(_df), max_lines=max_lines)
+
+def _trim_history(max_msgs: int = 12):
+    """Keep the last 12 messages (6 turns) on screen; older ones are folded into the running summary."""
+    if len(st.session_state.messages) > max_msgs:
+        dropped = st.session_state.messages[:-max_msgs]
+        st.session_state.history_summary = fold_turns(st.session_state.get("history_summary", ""), dropped)
+        st.session_state.messages = st.session_state.messages[-max_msgs:]
+
+def _token_caption(tokens) -> str:
+    source = "估計" if tokens.get("estimated") else "實際"
+    return (f"📥 輸入 {tokens['total']} tokens（{source}；資料摘要 {tokens['data']}、"
+            f"對話 {tokens['turns']} 則 {tokens['history']}）")
+
+def _seconds(value) -> str:
+    return "—" if value is None else f"{value:.2f} 秒"
+
+def _stream_debug(slot, scheduler=None):
+    """Sidebar panel with the streaming metrics of the recent model answers (all sessions)."""
+    summary = get_metrics_log().summary()
+    with slot.container():
+        with st.expander("🐞 串流效能"):
+            if scheduler is not None:
+                queue = scheduler.stats()
+                st.caption(f"模型排程：執行中 {queue['running']}、排隊 {queue['queued']}、"
+                           f"共用相同問題 {queue['coalesced']} 次、因排隊已滿拒絕 {queue['rejected']} 次")
+            if not summary["count"]:
+                st.caption("尚無模型回答")
+                return
+            last = summary["last"]
+            st.markdown(f"**最近一次**（{last['backend'] or '失敗'}）：排隊 {_seconds(last.get('queued'))}、"
+                        f"首字 {_seconds(last['ttft'])}、"
+                        f"總時間 {_seconds(last['latency'])}、{last['tokens']} tokens、"
+                        f"{(last['tokens_per_second'] or 0):.1f} tokens/秒、{last['frames']} 次繪製")
+            st.markdown(f"**近 {summary['count']} 次**：首字 p50 {_seconds(summary['ttft_p50'])} / "
+                        f"p95 {_seconds(summary['ttft_p95'])}；總時間 p50 {_seconds(summary['latency_p50'])} / "
+                        f"p95 {_seconds(summary['latency_p95'])}；速度 p50 "
+                        f"{(summary['tokens_per_second_p50'] or 0):.1f} tokens/秒")
 
 def chat_interface(df: pd.DataFrame):
     if df is None or df.empty:
         st.warning("⚠️ 無法顯示聊天，因為資料尚未載入。")
         return
 
-    # One-time compute & cache a lightweight DF summary
-    if "df_summary" not in st.session_state:
-        st.session_state.df_summary = _summarize_df(df, max_lines=40)
-
     # Initialize chat history
     if "messages" not in st.session_state:
         st.session_state.messages = []  # list[{"role": "user"|"assistant", "content": str}]
+        st.session_state.history_summary = ""
 
     st.markdown("歡迎問任何跟種植有關問題，AI 將根據資料摘要與對話脈絡回答：")
 
+    # The scheduler (and with it the model clients) and the embedding model are only
+    # built once a question needs them; the page itself just reads their metrics
+    semantic = get_semantic_cache()
+    debug_slot = st.sidebar.empty()
+    _stream_debug(debug_slot, current_scheduler())
+
     # Render history
     for m in st.session_state.messages:
         with st.chat_message(m["role"]):
             st.markdown(m["content"])
+            if m.get("from_data"):
+                st.caption("⚡ 由資料直接計算")
+            elif m.get("similar_to"):
+                st.caption(f"💾 相似問題的快取答案（相似度 {m['similarity']:.2f}）：{m['similar_to']}")
+                # Reports feed the false-hit audit used to tune the similarity threshold
+                if m.get("flagged"):
+                    st.caption("已回報為答非所問")
+                elif semantic is not None and st.button("👎 答非所問", key=f"flag-{m['lookup_id']}"):
+                    semantic.flag(m["lookup_id"])
+                    m["flagged"] = True
+                    st.rerun()
+            elif m.get("cached"):
+                st.caption("💾 快取答案")
+            elif m.get("tokens"):
+                st.caption(_token_caption(m["tokens"]))
 
     # Controls
     cols = st.columns(2)
     with cols[0]:
         if st.button("🧹 清除對話", use_container_width=True):
             st.session_state.messages = []
+            st.session_state.history_summary = ""
             st.rerun()
     with cols[1]:
         add_df_ctx = st.toggle("每回合加入資料摘要（RAG）", value=True, help="關閉可減少 Token 用量。")
 
+    if semantic is not None:
+        with st.expander("📈 相似問題快取統計"):
+            metrics = semantic.metrics()
+            cols = st.columns(3)
+            cols[0].metric("命中率", f"{metrics['hit_rate']:.0%}", help=f"{metrics['hits']} / {metrics['lookups']} 次查詢")
+            cols[1].metric("節省模型時間", f"{metrics['saved_seconds']:.0f} 秒")
+            cols[2].metric("答非所問回報", metrics["flagged"], help=f"佔命中的 {metrics['false_hit_rate']:.1%}")
+            caption = f"相似度門檻 {metrics['threshold']:.2f}（`CESTLAVIE_SEMANTIC_THRESHOLD`）"
+            if metrics["max_flagged_similarity"] is not None:
+                caption += f"；被回報的命中最高相似度 {metrics['max_flagged_similarity']:.2f}"
+            st.caption(caption)
+
     # User input
     user_text = st.chat_input("🔍 直接發問（自由輸入）")
     if not user_text:
@@ -57,39 +144,102 @@ def chat_interface(df: pd.DataFrame):
     with st.chat_message("user"):
         st.markdown(user_text)
 
-    # Prepare model input (free-form; no system msg)
-    if add_df_ctx and st.session_state.df_summary:
-        model_input = f"{user_text}\n\n[資料摘要]\n{st.session_state.df_summary}"
-    else:
-        model_input = user_text
+    # Exact aggregate questions (counts, top-k, earliest/latest…) are answered from the data directly
+    fast_answer = answer_question(df, user_text)
+    if fast_answer is not None:
+        with st.chat_message("assistant"):
+            st.markdown(fast_answer)
+            st.caption("⚡ 由資料直接計算")
+        st.session_state.messages.append({"role": "assistant", "content": fast_answer, "from_data": True})
+        _trim_history()
+        return
+
+    # The summary comes from the cached statistics, restricted to the products the question mentions
+    df_summary = _summarize_df(df, user_text) if add_df_ctx else ""
+
+    # Backends come from CESTLAVIE_LLM_BACKENDS; every session's calls go through one
+    # scheduler, which keeps the process under the provider's rate limits
+    scheduler = get_scheduler(_api_key())
+    if scheduler is None:
+        st.error("❌ 找不到 OpenAI API Key。請在 .streamlit/secrets.toml 或環境變數中設定 `OPENAI_API_KEY`，"
+                 "或設定 `CESTLAVIE_LLM_BACKENDS=ollama` 改用 Ollama。")
+        return
+
+    # Rules, data summary and as much recent conversation as fits the token budget;
+    # older turns reach the model through the running summary
+    model_input, tokens = build_context(user_text, df_summary, st.session_state.messages[:-1],
+                                        st.session_state.get("history_summary", ""))
+
+    # Repeated questions on the same data are answered from the persistent cache:
+    # exact repeats first, then paraphrases about the same products. Only follow-ups
+    # are scoped by the conversation before them, so they reuse answers given in the
+    # same context while self-contained questions hit whatever was asked before
+    data_version = df.attrs.get("data_version")
+    cache = get_answer_cache()
+    products = get_postings(df).match(user_text)
+    context = model_input[:-1] if is_follow_up(user_text, products) else ()
+    scope = answer_scope(scheduler.llm.identity, TEMPERATURE, data_version, bool(df_summary), context)
+    key = answer_key(user_text, scope)
+    message = None
+    cached = cache.get(key)
+    if cached is not None:
+        message = {"role": "assistant", "content": cached["answer"], "cached": True}
+    embedding = None
+    if message is None and semantic is not None:
+        hit, embedding = semantic.lookup(user_text, scope, products)
+        if hit is not None:
+            message = {"role": "assistant", "content": hit["answer"], "cached": True,
+                       "similar_to": hit["question"], "similarity": hit["similarity"], "lookup_id": hit["lookup_id"]}
+    if message is not None:
+        st.session_state.messages.append(message)
+        _trim_history()
+        st.rerun()
+
+    # Identical requests already in flight (same question and context) share that call
+    try:
+        call, joined = scheduler.submit(model_input, TEMPERATURE, tokens["total"])
+    except QueueFull:
+        st.warning("⏳ 目前提問的人太多，請稍後再試。")
+        st.session_state.messages.pop()
+        return
 
     # Stream the assistant reply
     with st.chat_message("assistant"):
-        placeholder = st.empty()
-        collected = []
+        # Deltas are coalesced into one redraw per frame instead of one per token
+        renderer = StreamRenderer(st.empty())
+        started = renderer.started
+        if joined:
+            st.caption("🔗 與其他人相同的問題，共用同一次回答")
 
         try:
-            with client.responses.stream(
-                model="gpt-4o-mini",
-                input=model_input,
-                temperature=0.2,
-            ) as stream:
-                for event in stream:
-                    if event.type == "response.output_text.delta":
-                        collected.append(event.delta)
-                        # Efficient incremental render
-                        placeholder.markdown("".join(collected))
-                # Final text
-                assistant_text = stream.get_final_response().output_text
+            call.wait_started(scheduler, lambda position: renderer.placeholder.markdown(
+                f"⏳ 排隊中，第 {position} 位…" if position else "⏳ 即將開始…"))
+            # Retries and fallback to the next backend happen before the first token
+            for delta in call.stream():
+                renderer.feed(delta)
+            reply = call.reply
+            assistant_text = reply.text
+            if reply.input_tokens is not None:
+                tokens = dict(tokens, total=reply.input_tokens, estimated=False)
         except Exception as e:
             assistant_text = f"❌ 發生錯誤：{e}"
-
-        placeholder.markdown(assistant_text)
+            reply = None
+        else:
+            # Only complete answers from the primary backend are cached (the scope names it)
+            if reply.backend is scheduler.llm.backends[0] and not joined:
+                cache.put(key, scope, data_version, user_text, assistant_text,
+                          latency=time.perf_counter() - started, embedding=embedding,
+                          topic=semantic.topic(products) if embedding is not None else "")
+
+        timing = renderer.finish(assistant_text, reply.output_tokens if reply is not None else None)
+        st.caption(_token_caption(tokens))
+
+    get_metrics_log().record({**timing, "backend": reply.backend.identity if reply is not None else None,
+                              "input_tokens": tokens["total"], "queued": call.queue_seconds,
+                              "shared": joined, "ok": reply is not None})
+    _stream_debug(debug_slot, scheduler)
 
     # Save assistant reply
-    st.session_state.messages.append({"role": "assistant", "content": assistant_text})
+    st.session_state.messages.append({"role": "assistant", "content": assistant_text, "tokens": tokens})
 
-    # Optional: trim history to avoid huge context (keeps last 12 messages = 6 turns)
-    max_msgs = 12
-    if len(st.session_state.messages) > max_msgs:
-        st.session_state.messages = st.session_state.messages[-max_msgs:]
+    _trim_history()
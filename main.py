@@ -1,8 +1,6 @@
 import streamlit as st
-from components.chat import chat_interface
-from components.image_gen import image_generator_ui
-from components.chart import chart_analytics_ui
 from utils.data_loader import load_data
+from utils.memory import frame_memory, process_memory, session_memory
 
 st.set_page_config(page_title="🥬 C'est la Vie AI", layout="wide")
 
@@ -13,13 +11,31 @@ page = st.sidebar.radio("請選擇功能：", ["💬 問答分析", "📊 圖表
 # Load data
 df = load_data()
 
+# Memory accounting: the dataset is shared (mapped) once per host, sessions only add their own state
+if df is not None:
+    with st.sidebar.expander("🧠 記憶體使用"):
+        mb = 1024 * 1024
+        frame = frame_memory(df)
+        st.metric("資料集（共用）", f"{frame['total'] / mb:.1f} MB",
+                  help=f"其中 {frame['mapped'] / mb:.1f} MB 由記憶體映射檔提供，可由所有工作階段與程序共用")
+        st.metric("本工作階段額外使用", f"{session_memory(st.session_state) / mb:.2f} MB")
+        proc = process_memory()
+        if proc:
+            st.caption(f"程序 RSS {proc['rss'] / mb:.0f} MB，其中檔案映射／共用 {proc['shared'] / mb:.0f} MB")
+
+# Page components are imported on first use, so each page loads only its own
+# dependencies (the chat page never pulls in matplotlib/seaborn/plotly)
+
 # 💬 Chat Interface
 if page == "💬 問答分析":
+    from components.chat import chat_interface
     st.title("💬 沙拉米 AI智慧助理")
     chat_interface(df)
 
 # 📊 Analytics + 🎨 Image Generator
 elif page == "📊 圖表分析與圖片生成":
+    from components.chart import chart_analytics_ui
+    from components.image_gen import image_generator_ui
     st.title("📊 圖表分析與圖片生成")
     chart_analytics_ui(df)
     st.subheader("🎨 圖片生成")
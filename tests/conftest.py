@@ -0,0 +1,25 @@
+import os
+import sys
+import itertools
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import schema  # noqa: E402
+
+_versions = itertools.count()
+
+
+def typed_frame(records):
+    """Schema-typed frame from Sheet1-style records, with its own data version."""
+    df, invalid = schema.validate(pd.DataFrame(records))
+    assert not any(invalid.values())
+    df = schema.add_derived_columns(df)
+    df.attrs["data_version"] = f"test-{next(_versions)}"
+    return df
+
+
+@pytest.fixture
+def make_frame():
+    return typed_frame
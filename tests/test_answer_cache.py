@@ -0,0 +1,46 @@
+from utils.answer_cache import AnswerCache, answer_scope, answer_key, is_follow_up
+from utils.context_builder import build_context
+
+
+def _scope(history=(), summary=""):
+    messages, _ = build_context("那綠火焰呢？", "", list(history), summary)
+    return answer_scope("openai:test", 0.2, "v1", False, messages[:-1])
+
+
+def test_fresh_conversations_share_a_scope():
+    assert _scope() == _scope()
+
+
+def test_follow_ups_are_scoped_by_the_conversation():
+    red = [{"role": "user", "content": "紅火焰的平均種植時間？"}, {"role": "assistant", "content": "約 45 天。"}]
+    green = [{"role": "user", "content": "綠橡的平均種植時間？"}, {"role": "assistant", "content": "約 50 天。"}]
+    assert len({_scope(), _scope(red), _scope(green), _scope(summary="問：紅火焰？ → 答：45 天")}) == 4
+    assert _scope(red) == _scope(red)
+
+
+def test_answers_are_found_only_under_their_scope(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    red = [{"role": "user", "content": "紅火焰的平均種植時間？"}, {"role": "assistant", "content": "約 45 天。"}]
+    key = answer_key("那綠火焰呢？", _scope(red))
+    cache.put(key, _scope(red), "v1", "那綠火焰呢？", "約 48 天。")
+    assert cache.get(key)["answer"] == "約 48 天。"
+    assert cache.get(answer_key("那綠火焰呢？", _scope())) is None
+    assert cache.get(answer_key("那綠火焰呢", _scope(red))) is not None
+
+
+def test_only_follow_ups_depend_on_the_conversation():
+    assert is_follow_up("那綠火焰呢？", ["綠火焰"])
+    assert is_follow_up("它的採收期是什麼時候？", ["紅火焰"])
+    assert is_follow_up("平均要種幾天？", [])
+    assert not is_follow_up("紅火焰的平均種植時間？", ["紅火焰"])
+
+
+def test_self_contained_questions_hit_later_in_the_same_conversation(tmp_path):
+    # The same question asked twice in one session: the second time the first
+    # answer is part of the conversation, but the question doesn't depend on it
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    question = "紅火焰的平均種植時間？"
+    assert not is_follow_up(question, ["紅火焰"])
+    scope = answer_scope("openai:test", 0.2, "v1", False, ())
+    cache.put(answer_key(question, scope), scope, "v1", question, "約 45 天。")
+    assert cache.get(answer_key("紅火焰的平均種植時間", scope))["answer"] == "約 45 天。"
@@ -0,0 +1,115 @@
+import pytest
+from utils.answer_engine import route_question, answer_question
+
+PRODUCTS = ["紅火焰", "綠火焰", "綠橡", "奶油波士頓"]
+STATUSES = ["種植中", "已採收"]
+
+
+def _match(question):
+    return [name for name in PRODUCTS if name in question]
+
+
+def _route(question):
+    route = route_question(question, _match, STATUSES)
+    return route and route["intent"]
+
+
+@pytest.mark.parametrize("question", [
+    "2023年種了多少顆紅火焰？",
+    "去年採收了多少顆",
+    "今年紅火焰共有多少顆",
+    "上個月採收了幾顆綠橡",
+    "本週種了多少",
+    "5月種了多少顆",
+    "2023-05 採收多少顆",
+    "最近3個月採收多少顆",
+    "平均每個月種植多少顆",
+    "每週採收幾顆紅火焰",
+    "種植時間超過60天的有多少",
+    "種植時間最長的產品是哪個",
+])
+def test_unapplied_constraints_go_to_llm(question):
+    assert _route(question) is None
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("紅火焰共有多少顆？", "count"),
+    ("有多少種產品？", "distinct"),
+    ("總共有幾種產品", "distinct"),
+    ("紅火焰有幾個編號", "distinct"),
+    ("統計最多的產品是哪兩種？", "top_products"),
+    ("最早統計的資料的是哪一筆", "earliest"),
+    ("最近一筆採收的資料", "latest"),
+    ("紅火焰的平均種植時間", "day_stat"),
+    ("產品編號為1101是哪個產品？", "id_products"),
+])
+def test_supported_questions_are_routed(question, intent):
+    assert _route(question) == intent
+
+
+@pytest.fixture
+def df(make_frame):
+    rows = [
+        (1101, "紅火焰", "2022-03-03", "2022-04-20", "已採收"),
+        (1101, "綠火焰", "2022-03-05", "2022-04-22", "已採收"),
+        (1102, "紅火焰", "2023-01-10", "2023-02-25", "種植中"),
+        (1103, "綠橡", "2023-06-01", "2023-07-15", "種植中"),
+        (1104, "綠橡", "2023-06-02", "2023-07-20", "種植中"),
+        (1105, "奶油波士頓", "2024-02-01", "2024-03-20", "已採收"),
+    ]
+    return make_frame([dict(zip(["產品編號", "產品名稱", "種植日期", "採收日期", "狀態"], row)) for row in rows])
+
+
+def test_distinct_products_counts_names_not_rows(df):
+    answer = answer_question(df, "有多少種產品？")
+    assert answer.startswith("全部資料共有 4 種產品")
+
+
+def test_distinct_ids(df):
+    assert answer_question(df, "紅火焰有幾個編號") == "紅火焰共有 2 個不同的產品編號（2 筆）。"
+
+
+def test_time_scoped_count_is_not_answered(df):
+    assert answer_question(df, "2023年種了多少顆紅火焰？") is None
+    assert answer_question(df, "去年採收了多少顆") is None
+
+
+def test_count(df):
+    assert answer_question(df, "紅火焰共有多少顆？") == "紅火焰共有 2 顆。"
+
+
+SAME_ANSWER_QUESTIONS = [
+    "紅火焰共有多少顆？",
+    "紅火焰和綠橡共有多少顆？",
+    "有多少種產品？",
+    "紅火焰有幾個編號",
+    "統計最多的產品是哪兩種？",
+    "統計最少的產品是哪一種？",
+    "產品狀態大部分是什麼？",
+    "綠橡的狀態",
+    "產品編號為1101是哪個產品？",
+    "綠橡最早種植的資料是哪一筆",
+    "紅火焰的平均種植時間",
+    "奶油波士頓的產品編號範圍",
+    "綠火焰狀態為種植中的有多少顆",
+]
+
+
+def test_sqlite_store_gives_the_same_answers(df, tmp_path, monkeypatch):
+    from utils import answer_engine
+    from utils.sqlite_store import build_store
+
+    expected = {question: answer_question(df, question) for question in SAME_ANSWER_QUESTIONS}
+    store = build_store([df], str(tmp_path / "products.sqlite"), df.attrs["data_version"])
+    calls = []
+    for method in ("query", "count", "value_counts"):
+        original = getattr(store, method)
+        monkeypatch.setattr(store, method, lambda *a, _f=original, _m=method, **k: calls.append(_m) or _f(*a, **k))
+    monkeypatch.setattr(answer_engine, "get_store", lambda _df: store)
+
+    assert {question: answer_question(df, question) for question in SAME_ANSWER_QUESTIONS} == expected
+    # Counts and top-k are aggregated in SQLite rather than read back as rows
+    calls.clear()
+    answer_question(df, "紅火焰共有多少顆？")
+    answer_question(df, "統計最多的產品是哪兩種？")
+    assert calls == ["count", "value_counts"]
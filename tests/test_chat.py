@@ -0,0 +1,65 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+from benchmarks.synthetic import write_export
+from components import chat
+from utils import data_loader, frame_cache, scheduler
+from utils.answer_cache import AnswerCache
+from utils.llm_backends import LLMRouter, OllamaBackend
+from utils.llm_stub import serve
+from utils.stream_render import MetricsLog
+
+
+def _page():
+    from utils.data_loader import load_data
+    from components.chat import chat_interface
+    chat_interface(load_data())
+
+
+@pytest.fixture
+def chat_app(tmp_path, monkeypatch):
+    """`(new_session, stub)`: chat page sessions over a small export, answered by the Ollama stub."""
+    monkeypatch.setattr(data_loader, "DATA_PATH", write_export(str(tmp_path / "export.json"), 500))
+    monkeypatch.setattr(frame_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    stub = serve(0, first_token=0, token_delay=0, tokens=5)
+    host = "http://127.0.0.1:%d" % stub.server_address[1]
+    monkeypatch.setattr(scheduler, "get_llm", lambda api_key=None: LLMRouter([OllamaBackend(host=host)]))
+    monkeypatch.setattr(scheduler, "_current", None)
+    scheduler.get_scheduler.clear()
+    answers = AnswerCache(str(tmp_path / "answers.sqlite"))
+    monkeypatch.setattr(chat, "get_answer_cache", lambda: answers)
+    monkeypatch.setattr(chat, "get_semantic_cache", lambda: None)
+    metrics = MetricsLog(str(tmp_path / "metrics.jsonl"))
+    monkeypatch.setattr(chat, "get_metrics_log", lambda: metrics)
+
+    def new_session():
+        at = AppTest.from_function(_page, default_timeout=60)
+        at.run()
+        return at
+
+    yield new_session, stub
+    stub.shutdown()
+    scheduler.get_scheduler.clear()
+
+
+def _ask(at, question):
+    at.chat_input[0].set_value(question).run()
+    assert not at.exception
+
+
+def test_a_repeated_question_is_answered_from_the_cache(chat_app):
+    new_session, stub = chat_app
+    at = new_session()
+    _ask(at, "紅火焰要怎麼種比較好？")
+    _ask(at, "紅火焰要怎麼種比較好？")
+    assert stub.config.requests == 1
+    assert at.session_state.messages[-1].get("cached")
+
+
+def test_follow_ups_reach_the_model_in_a_different_conversation(chat_app):
+    new_session, stub = chat_app
+    first, second = new_session(), new_session()
+    _ask(first, "紅火焰要怎麼種比較好？")
+    _ask(first, "那綠火焰呢？")
+    _ask(second, "綠橡要怎麼種比較好？")
+    _ask(second, "那綠火焰呢？")
+    assert stub.config.requests == 4
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import records
+from utils.cube import build_cube, rollup, slice_months
+
+RANGES = [("2022-01-01", "2030-01-01"), ("2022-06-15", "2023-02-10"), ("2023-03-31", "2023-04-01"),
+          ("2024-11-01", "2025-01-31"), ("2021-01-01", "2021-12-31")]
+
+
+@pytest.fixture
+def df(make_frame):
+    return make_frame([record for record in records(3000, seed=3) if "狀態" in record])
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("by", [["產品名稱"], ["狀態"], ["產品名稱", "種植月"]])
+def test_rollup_matches_a_row_level_groupby(df, start, end, by):
+    rows = df.assign(種植月=df["種植日期"].dt.to_period("M").dt.to_timestamp(),
+                     採收月=df["採收日期"].dt.to_period("M").dt.to_timestamp())
+    rows = rows[(rows["種植月"] >= pd.Timestamp(start).to_period("M").to_timestamp())
+                & (rows["採收月"] <= pd.Timestamp(end).to_period("M").to_timestamp())]
+    expected = rows.groupby(by, observed=True)["種植時間（日）"].agg(["count", "mean", lambda d: d.std(ddof=0)])
+    expected.columns = ["count", "mean_days", "std_days"]
+
+    out = rollup(slice_months(build_cube(df), start, end), by)
+    assert len(out) == len(expected)
+    out = out.reindex(expected.index)
+    np.testing.assert_array_equal(out["count"], expected["count"])
+    np.testing.assert_allclose(out["mean_days"], expected["mean_days"])
+    np.testing.assert_allclose(out["std_days"], expected["std_days"], atol=1e-6)
+
+
+def test_cube_is_much_smaller_than_the_rows(df):
+    cube = build_cube(df)
+    assert cube["count"].sum() == len(df) and len(cube) < len(df)
@@ -0,0 +1,146 @@
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import synthetic
+from utils import data_loader, frame_cache, stats
+from utils.data_loader import _Stream, iter_sheet1_records
+
+RECORDS = [
+    {"產品編號": 1101, "產品名稱": "紅火焰", "種植日期": "2022-03-03", "採收日期": "2022-04-20", "狀態": "已採收"},
+    # Braces, brackets, commas and escaped quotes inside string values
+    {"產品編號": 1102, "產品名稱": "綠}火焰", "種植日期": "2022-03-05", "採收日期": "2022-04-22", "狀態": "種植中",
+     "備註": "}}, {\"x\": [1, \"]\"]} \\ }"},
+    {"產品編號": 1103, "產品名稱": "{綠橡}", "種植日期": "2023-06-01", "採收日期": "2023-07-15"},
+    {"產品編號": 1104, "產品名稱": "奶油波士頓", "種植日期": "2024-02-01", "採收日期": "2024-03-20", "狀態": "已採收",
+     "批次": {"溫室": "A}", "層": [1, 2, {"}": "{"}]}},
+] * 5
+
+
+def _write(tmp_path, document, indent=None):
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=indent), encoding="utf-8")
+    return str(path)
+
+
+def _records(path, chunk_rows=3):
+    return [record for chunk in iter_sheet1_records(path, chunk_rows) for record in chunk]
+
+
+@pytest.mark.parametrize("read_size", [7, 64, 301, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_braces_inside_strings_at_any_buffer_boundary(tmp_path, monkeypatch, read_size, indent):
+    monkeypatch.setattr(data_loader, "READ_SIZE", read_size)
+    assert _records(_write(tmp_path, {"Sheet1": RECORDS}, indent)) == RECORDS
+
+
+def test_other_top_level_keys_before_sheet1(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "READ_SIZE", 16)
+    document = {"Other": [1, 2, {"a": "]"}], "Meta": {"}": "{", "n": 3.5e10}, "Empty": [], "Sheet1": RECORDS,
+                "After": {"ignored": True}}
+    assert _records(_write(tmp_path, document)) == RECORDS
+
+
+def test_missing_sheet1(tmp_path):
+    with pytest.raises(KeyError):
+        _records(_write(tmp_path, {"Other": RECORDS}))
+
+
+def test_chunks_hold_at_most_chunk_rows(tmp_path):
+    chunks = list(iter_sheet1_records(_write(tmp_path, {"Sheet1": RECORDS}), chunk_rows=3))
+    assert [len(chunk) for chunk in chunks] == [3] * 6 + [2]
+
+
+def _stream(text):
+    stream = _Stream(io.StringIO(text))
+    stream.fill()
+    return stream
+
+
+def test_batch_retries_up_to_the_last_complete_element():
+    # The last '}' in the buffer is inside the unfinished third element's string
+    text = '{"a": 1}, {"b": "}"}, {"c": "x}y'
+    stream = _stream(text)
+    assert stream._batch(json.JSONDecoder()) == [{"a": 1}, {"b": "}"}]
+    assert text[stream.pos:] == ', {"c": "x}y'
+
+
+def test_batch_falls_back_to_decoding_one_element():
+    # The only '}' buffered is inside a string: no element is complete, so the next one is
+    # decoded alone after reading more of the file
+    text = '{"a": "}"}'
+    stream = _Stream(io.StringIO(text))
+    stream.buf = '{"a": "}'
+    stream.file.seek(len(stream.buf))
+    decoder = json.JSONDecoder()
+    assert stream._batch(decoder) == [{"a": "}"}]
+    assert stream.pos == len(stream.buf) and stream.buf == text
+
+
+def _export(path, records):
+    path.write_text(json.dumps({"Sheet1": records}, ensure_ascii=False), encoding="utf-8")
+
+
+def _edit(records):
+    """The same export after an update: changed, dropped, duplicated and added records."""
+    changed = [dict(record, 狀態="已採收") for record in records[:20]]
+    kept = records[50:]
+    return changed + kept + kept[:10] + list(synthetic.records(40, seed=1))
+
+
+def _load(monkeypatch, data_path, cache_dir):
+    monkeypatch.setattr(data_loader, "DATA_PATH", str(data_path))
+    monkeypatch.setattr(frame_cache, "CACHE_DIR", str(cache_dir))
+    df = data_loader.load_data()
+    state = data_loader._dataset_state()
+    return df, state["keys"], data_loader.dataset_stats(df)
+
+
+def _assert_same_stats(left, right):
+    for name in stats.TABLES:
+        pd.testing.assert_series_equal(left[name].sort_index(), right[name].sort_index(), check_names=False)
+    pd.testing.assert_frame_equal(left["id_hll"].sort_index(), right["id_hll"].sort_index())
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_incremental_reload_matches_a_full_reload(tmp_path, monkeypatch, partitioned):
+    monkeypatch.setattr(data_loader, "MAX_WORKERS", 1)
+    records = list(synthetic.records(300))
+    source = tmp_path / "data"
+    source.mkdir()
+    if partitioned:
+        _export(source / "2023.json", list(synthetic.records(100, seed=2)))
+    path = source / "2022.json"
+    _export(path, records)
+    data_path = source if partitioned else path
+
+    data_loader._dataset_state.clear()
+    before, _, _ = _load(monkeypatch, data_path, tmp_path / "cache")
+    _export(path, _edit(records))
+    df, keys, incremental = _load(monkeypatch, data_path, tmp_path / "cache")
+
+    data_loader._dataset_state.clear()
+    full_df, full_keys, full = _load(monkeypatch, data_path, tmp_path / "fresh-cache")
+    pd.testing.assert_frame_equal(df, full_df)
+    np.testing.assert_array_equal(keys, full_keys)
+    _assert_same_stats(incremental, full)
+    assert df.attrs["invalid_rows"] == full_df.attrs["invalid_rows"]
+    if not partitioned:
+        # Valid unchanged records are reused, duplicates included (some "changed" ones already
+        # had 已採收); records without 狀態 are dropped either way
+        old = {json.dumps(record, sort_keys=True) for record in records}
+        valid = [record for record in _edit(records) if "狀態" in record]
+        reused = sum(json.dumps(record, sort_keys=True) in old for record in valid)
+        assert len(df) == len(valid) and reused >= 250
+        assert df.attrs["delta"] == {"parent": before.attrs["data_version"], "reused": reused,
+                                     "added": len(valid) - reused}
+
+
+def test_partitions_are_discovered_in_path_order(tmp_path):
+    for name in ["b.json", "a/2.json", "a/1.xlsx", "a/.hidden.json", "a/~$1.xlsx", "c.txt", ".cache/x.json", "0/z.json"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("{}")
+    found = [os.path.relpath(path, tmp_path) for path in data_loader.discover_partitions(str(tmp_path))]
+    assert found == ["0/z.json", "a/1.xlsx", "a/2.json", "b.json"]
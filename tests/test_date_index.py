@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.date_index import DateIndex
+
+FIRST_DAY = pd.Timestamp("2022-03-03")
+
+
+def _frame(make_frame, rng, rows, min_days, times=False):
+    planted = FIRST_DAY + pd.to_timedelta(rng.integers(0, 700, rows), unit="D")
+    harvested = planted + pd.to_timedelta(rng.integers(min_days, 90, rows), unit="D")
+    if times:
+        planted += pd.to_timedelta(rng.integers(0, 24 * 60, rows), unit="min")
+        harvested += pd.to_timedelta(rng.integers(0, 24 * 60, rows), unit="min")
+    return make_frame([{"產品編號": 1000 + i, "產品名稱": "紅火焰", "種植日期": p.isoformat(), "採收日期": h.isoformat(),
+                        "狀態": "已採收"} for i, (p, h) in enumerate(zip(planted, harvested))])
+
+
+def _ranges(rng, count=60):
+    for _ in range(count):
+        start = FIRST_DAY + pd.Timedelta(days=int(rng.integers(-30, 800)))
+        yield start, start + pd.Timedelta(days=int(rng.integers(0, 300)), hours=int(rng.integers(0, 24)))
+
+
+@pytest.mark.parametrize("min_days", [0, -10])
+@pytest.mark.parametrize("order", ["sorted", "shuffled"])
+@pytest.mark.parametrize("times", [False, True])
+def test_lookups_match_boolean_masks(make_frame, min_days, order, times):
+    rng = np.random.default_rng(abs(min_days) + len(order) + times)
+    df = _frame(make_frame, rng, 2000, min_days, times)
+    if order == "sorted":
+        df = df.sort_values(["種植日期", "採收日期"], kind="stable", ignore_index=True)
+    else:
+        df = df.sample(frac=1, random_state=1, ignore_index=True)
+    index = DateIndex(df)
+    planting, harvest = df["種植日期"], df["採收日期"]
+    # Row labels are positions in df, so equal labels mean the same rows in the same order
+    for start, end in _ranges(rng):
+        np.testing.assert_array_equal(index.select(start, end).index, df.index[(planting >= start) & (harvest <= end)])
+        np.testing.assert_array_equal(index.planted_between(start, end).index,
+                                      df.index[(planting >= start) & (planting <= end)])
+        np.testing.assert_array_equal(index.harvested_between(start, end).index,
+                                      df.index[(harvest >= start) & (harvest <= end)])
+
+
+def test_select_counts_partial_days_before_the_cutoff(make_frame):
+    # 89 days 23 hours counts as 89 growing days, but the row is harvested after `end`
+    df = make_frame([
+        {"產品編號": 1, "產品名稱": "紅火焰", "種植日期": "2022-03-01T00:00", "採收日期": "2022-05-29T23:00", "狀態": "已採收"},
+        {"產品編號": 2, "產品名稱": "紅火焰", "種植日期": "2022-03-02T00:00", "採收日期": "2022-03-20T00:00", "狀態": "已採收"},
+    ])
+    end = pd.Timestamp("2022-05-29T01:00")
+    assert list(DateIndex(df).select("2022-01-01", end)["產品編號"]) == [2]
+
+
+def test_select_is_a_slice_when_the_whole_planting_range_qualifies(make_frame):
+    df = _frame(make_frame, np.random.default_rng(0), 500, 40).sort_values("種植日期", ignore_index=True)
+    rows = DateIndex(df).select(FIRST_DAY, FIRST_DAY + pd.Timedelta(days=900))
+    assert len(rows) == len(df) and np.shares_memory(rows["產品編號"].to_numpy(), df["產品編號"].to_numpy())
@@ -0,0 +1,71 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded only when a chart is drawn, a report is built or OpenAI is called
+HEAVY_MODULES = {"matplotlib", "seaborn", "openai", "openpyxl"}
+# Cumulative cold-import budgets, about twice what each takes here (Streamlit included):
+# components.chat ~1.0-1.2 s, components.chart ~1.8 s, main.py's own imports ~1.0 s
+BUDGET_SECONDS = {"components.chat": 2.5, "components.chart": 3.5, "utils.data_loader": 2.0, "utils.memory": 1.0}
+
+# First render of the chat page in a fresh interpreter, with sentence-transformers
+# reported as installed; prints what got loaded
+FIRST_RENDER = """
+import sys
+from streamlit.testing.v1 import AppTest
+from benchmarks.synthetic import write_export
+from utils import answer_cache, data_loader, frame_cache, semantic_cache
+frame_cache.CACHE_DIR = sys.argv[1]
+data_loader.DATA_PATH = write_export(sys.argv[1] + "/export.json", 200)
+answers = answer_cache.AnswerCache(sys.argv[1] + "/answers.sqlite")
+answer_cache.get_answer_cache = semantic_cache.get_answer_cache = lambda: answers
+semantic_cache.HAS_SENTENCE_TRANSFORMERS = True
+loaded = []
+semantic_cache._load_embedder = lambda name: loaded.append(name)
+at = AppTest.from_file("main.py", default_timeout=60)
+at.run()
+assert not at.exception, at.exception
+print("openai" in sys.modules, bool(loaded))
+"""
+
+
+def _env():
+    return {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+
+
+def _import_times(module):
+    """`{module: cumulative microseconds}` from `python -X importtime -c "import <module>"`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_chat_does_not_load_plotting_or_llm_clients():
+    times = _import_times("components.chat")
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & HEAVY_MODULES
+    assert times["components.chat"] < BUDGET_SECONDS["components.chat"] * 1_000_000
+
+
+def test_main_and_chart_page_imports():
+    # main.py itself only imports the loader and memory accounting; the chart page
+    # needs matplotlib and seaborn but not the LLM client or the Excel reader
+    for module, unwanted in (("utils.data_loader", HEAVY_MODULES), ("utils.memory", HEAVY_MODULES),
+                             ("components.chart", {"openai", "openpyxl"})):
+        times = _import_times(module)
+        loaded = {name.split(".")[0] for name in times}
+        assert not loaded & unwanted, module
+        assert times[module] < BUDGET_SECONDS[module] * 1_000_000, module
+
+
+def test_first_chat_render_builds_no_model_client_or_embedder(tmp_path):
+    result = subprocess.run([sys.executable, "-c", FIRST_RENDER, str(tmp_path)], cwd=ROOT,
+                            env=dict(_env(), OPENAI_API_KEY="sk-test"), capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
@@ -0,0 +1,79 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from utils.keyword_matcher import KeywordMatcher, ProductPostings
+from utils.vocabulary import product_list
+
+
+def _naive_find(keywords, text):
+    """Leftmost-longest scan by brute force."""
+    found, pos = [], 0
+    while pos < len(text):
+        hits = [keyword for keyword in keywords if text.startswith(keyword, pos)]
+        if hits:
+            longest = max(hits, key=len)
+            found.append(longest)
+            pos += len(longest)
+        else:
+            pos += 1
+    return found
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("綠火焰有多少顆", ["綠火焰"]),
+    ("紅綠火焰", ["紅綠"]),
+    ("紅綠和綠火焰", ["紅綠", "綠火焰"]),
+    ("英貝比萵(不分品種)共有幾顆", ["英貝比萵(不分品種)"]),
+    ("英貝比萵和貝比萵", ["英貝比萵", "貝比萵"]),
+    ("恐龍羽衣甘藍與捲葉甘藍", ["恐龍羽衣甘藍", "捲葉甘藍"]),
+    ("沒有產品", []),
+])
+def test_leftmost_longest(text, expected):
+    assert KeywordMatcher(product_list).find(text) == expected
+    assert KeywordMatcher(reversed(product_list)).find(text) == expected
+
+
+def test_find_all_reports_overlaps():
+    hits = KeywordMatcher(product_list).find_all("英貝比萵(不分品種)")
+    assert (0, "英貝比萵") in hits and (1, "貝比萵") in hits and (0, "英貝比萵(不分品種)") in hits
+
+
+def test_matches_brute_force_on_random_text():
+    rng = random.Random(0)
+    keywords = ["a", "ab", "abc", "bc", "bca", "c", "cab", "ba"]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(500):
+        text = "".join(rng.choice("abcx") for _ in range(rng.randint(0, 12)))
+        assert matcher.find(text) == _naive_find(keywords, text)
+        assert sorted(matcher.find_all(text)) == sorted(
+            (i, k) for k in keywords for i in range(len(text)) if text.startswith(k, i))
+
+
+@pytest.fixture
+def names():
+    rng = np.random.default_rng(0)
+    values = rng.choice(["紅火焰", "綠火焰", "紅綠", "英貝比萵", "英貝比萵(不分品種)", "貝比萵", None], 500)
+    # An unused category and missing names must not show up in any posting list
+    return pd.Series(values).astype(pd.CategoricalDtype(["紅火焰", "綠火焰", "紅綠", "英貝比萵",
+                                                         "英貝比萵(不分品種)", "貝比萵", "紅狐"]))
+
+
+def test_postings_match_a_scan(names):
+    postings = ProductPostings(pd.DataFrame({"產品名稱": names}))
+    as_text = names.astype(str)
+    for name in names.cat.categories:
+        assert postings.rows(name).tolist() == np.flatnonzero(as_text == name).tolist()
+    # Keywords that are not names themselves select every name containing them
+    for keyword in ["火焰", "比萵", "綠"]:
+        expected = np.flatnonzero(as_text.str.contains(keyword, regex=False) & names.notna())
+        assert postings.rows(keyword).tolist() == expected.tolist()
+    assert postings.rows(["紅火焰", "綠火焰"]).tolist() == np.flatnonzero(as_text.isin(["紅火焰", "綠火焰"])).tolist()
+    assert postings.count("紅狐") == 0 and postings.count("不存在") == 0
+
+
+def test_take_returns_the_rows(names):
+    df = pd.DataFrame({"產品名稱": names, "i": range(len(names))})
+    postings = ProductPostings(df)
+    assert postings.take("貝比萵").equals(df[df["產品名稱"] == "貝比萵"])
+    assert postings.match("英貝比萵(不分品種)和紅狐") == ["英貝比萵(不分品種)", "紅狐"]
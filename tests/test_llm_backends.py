@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from utils import llm_backends
+from utils.llm_backends import Backend, LLMError, LLMRouter, OllamaBackend, RetryableError
+from utils.llm_stub import serve
+
+MESSAGES = [{"role": "user", "content": "紅火焰要怎麼種？"}]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_backends, "backoff", lambda attempt: 0)
+
+
+def _start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _MalformedHandler(BaseHTTPRequestHandler):
+    """Answers /api/chat with a line that is not JSON."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b"<html>proxy error</html>\n"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_backend_must_implement_open():
+    with pytest.raises(TypeError):
+        Backend("model")
+
+
+def test_malformed_stream_line_falls_back_to_the_next_backend():
+    bad = _start(ThreadingHTTPServer(("127.0.0.1", 0), _MalformedHandler))
+    good = serve(0, first_token=0, token_delay=0, tokens=5)
+    try:
+        broken = OllamaBackend("stub", host=f"http://127.0.0.1:{bad.server_address[1]}")
+        with pytest.raises(LLMError):
+            next(broken.open(MESSAGES, 0.2, llm_backends.Reply(broken)))
+        fallback = OllamaBackend("stub", host=f"http://127.0.0.1:{good.server_address[1]}")
+        reply = LLMRouter([broken, fallback]).stream(MESSAGES)
+        assert len("".join(reply)) == 5 and reply.backend is fallback
+    finally:
+        bad.shutdown()
+        good.shutdown()
+
+
+class _FailingResponses:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+@pytest.mark.parametrize("status, retried", [(408, True), (429, True), (503, True), (400, False)])
+def test_openai_status_errors(status, retried):
+    openai = pytest.importorskip("openai")
+    # 408 has no class of its own and arrives as a plain APIStatusError
+    error_class = {429: openai.RateLimitError, 503: openai.InternalServerError,
+                   400: openai.BadRequestError}.get(status, openai.APIStatusError)
+    # Built without an HTTP response, which only the client's own code path needs
+    error = error_class.__new__(error_class)
+    Exception.__init__(error, f"Error code: {status}")
+    error.status_code = status
+    backend = llm_backends.OpenAIBackend("sk-test", "test-model")
+    responses = _FailingResponses(error)
+    backend.client = type("Client", (), {"responses": responses})()
+
+    with pytest.raises(LLMError) as raised:
+        backend.open(MESSAGES, 0.2, llm_backends.Reply(backend))
+    assert isinstance(raised.value, RetryableError) == retried
+    with pytest.raises(LLMError):
+        LLMRouter([backend], retries=2).stream(MESSAGES)
+    assert responses.calls == 1 + (3 if retried else 1)
@@ -0,0 +1,75 @@
+import gc
+import logging
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import pytest
+from utils import render_cache
+from utils.render_cache import RenderCache, cached_render, render_figure
+from utils.figures import bar_figure, pie_figure
+from utils.memory import process_memory
+
+logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+# The CJK fonts in utils.figures may be missing on test machines
+pytestmark = pytest.mark.filterwarnings("ignore:Glyph")
+
+NAMES = [f"產品{i}" for i in range(12)]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # Small budget, so the loop below keeps evicting
+    cache = RenderCache(max_bytes=1 << 20)
+    monkeypatch.setattr(render_cache, "get_render_cache", lambda: cache)
+    return cache
+
+
+def _draw(i):
+    if i % 2:
+        return lambda: pie_figure(pd.Series([i + 1, 7], index=["種植中", "已採收"]))
+    return lambda: bar_figure(pd.Series(np.arange(12) + i, index=NAMES), f"第 {i} 張", "數量")
+
+
+def _small(i):
+    # Cheap to draw, so the loop below can afford 1,000 reruns
+    def draw():
+        fig, ax = plt.subplots(figsize=(2, 1.5))
+        ax.bar(range(5), [i % 7 + 1, 2, 3, 4, 5])
+        return fig
+    return draw
+
+
+def test_rendering_leaks_no_figures_or_memory(cache):
+    if process_memory() is None:
+        pytest.skip("needs /proc")
+    plt.close("all")
+    # Warm up fonts, caches and allocator pools; closed figures are freed by the cycle collector
+    for i in range(50):
+        cached_render(("warm", i), _small(i))
+    gc.collect()
+    before = process_memory()["rss"]
+    # 1,000 reruns: every fifth one picks a new range, the others redraw a recent one
+    for i in range(1000):
+        view = i // 5 if i % 5 == 0 else max(0, i // 5 - i % 3)
+        cached_render(("view", view), _small(view))
+        assert plt.get_fignums() == []
+    gc.collect()
+    growth = process_memory()["rss"] - before
+    assert cache.misses == 50 + 200 and cache.hits == 800 and cache.size <= cache.max_bytes
+    # Leaking these 200 figures would add ~140 MB here; the loop itself grows RSS by 4-18 MB,
+    # depending on what earlier tests left in the allocator
+    assert growth < 32 << 20
+
+
+def test_cache_hits_skip_drawing(cache):
+    draws = []
+    for _ in range(3):
+        cached_render(("same",), lambda: draws.append(1) or _draw(0)())
+    assert len(draws) == 1 and cache.hits == 2
+
+
+def test_figure_is_closed_when_rendering_fails():
+    fig = bar_figure(pd.Series([1, 2], index=NAMES[:2]), "t", "y")
+    with pytest.raises(ValueError):
+        render_figure(fig, fmt="not-a-format")
+    assert plt.get_fignums() == []
@@ -0,0 +1,50 @@
+import threading
+from utils.scheduler import Scheduler
+
+
+class _Reply(list):
+    input_tokens = None
+    output_tokens = None
+
+
+class _BlockingLLM:
+    """Answers only once released, so submitted calls stay in flight."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def stream(self, messages, temperature):
+        self.calls += 1
+        self.release.wait(5)
+        return _Reply(["ok"])
+
+
+def _messages(*turns):
+    return [{"role": "system", "content": "rules"}, *turns, {"role": "user", "content": "那綠火焰呢？"}]
+
+
+def test_identical_requests_share_one_call():
+    llm = _BlockingLLM()
+    scheduler = Scheduler(llm, max_concurrent=2)
+    first, joined_first = scheduler.submit(_messages(), 0.2, 10)
+    second, joined_second = scheduler.submit(_messages(), 0.2, 10)
+    llm.release.set()
+    assert (joined_first, joined_second) == (False, True)
+    assert second is first and "".join(second.stream()) == "ok"
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_same_question_in_another_conversation_is_not_shared():
+    llm = _BlockingLLM()
+    scheduler = Scheduler(llm, max_concurrent=2)
+    turn = {"role": "assistant", "content": "紅火焰約 45 天。"}
+    first, _ = scheduler.submit(_messages(), 0.2, 10)
+    second, joined = scheduler.submit(_messages(turn), 0.2, 10)
+    third, joined_third = scheduler.submit(_messages(), 0.7, 10)
+    llm.release.set()
+    assert not joined and not joined_third
+    assert len({id(first), id(second), id(third)}) == 3
+    for call in (first, second, third):
+        assert "".join(call.stream()) == "ok"
+    assert llm.calls == 3
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from utils import schema
+
+GOOD = {"產品編號": 1101, "產品名稱": "紅火焰", "種植日期": "2022-03-03", "採收日期": "2022-04-20", "狀態": "已採收"}
+
+
+def _raw(*changes):
+    return pd.DataFrame([dict(GOOD, **change) for change in changes], dtype=object)
+
+
+def test_invalid_rows_are_counted_once_per_reason():
+    raw = _raw(
+        {},
+        {"產品編號": "1102"},
+        {"產品編號": 1103.0, "種植日期": "2022-03-03 00:00:00"},
+        {"狀態": None},                                    # missing
+        {"產品名稱": ""},                                   # empty
+        {"產品編號": "abc"},                                # not a number
+        {"產品編號": 11.5},                                 # not an integer
+        {"產品編號": 2 ** 31},                              # out of int32 range
+        {"種植日期": "03/03/2022"},                         # not ISO
+        {"採收日期": "2022-13-01"},                         # no such month
+        {"產品編號": "abc", "種植日期": None},              # missing wins over the later checks
+        {"產品編號": 11.5, "採收日期": "yesterday"},        # bad id wins over the bad date
+    )
+    df, invalid = schema.validate(raw)
+    assert invalid == {"missing_value": 3, "invalid_product_id": 4, "invalid_date": 2}
+    assert list(df["產品編號"]) == [1101, 1102, 1103]
+    assert schema.format_invalid_counts(invalid) == "欄位缺漏或為空值 3 筆，產品編號不是有效整數 4 筆，日期格式錯誤 2 筆"
+
+
+def test_missing_column_rejects_every_row():
+    df, invalid = schema.validate(_raw({}, {}).drop(columns="狀態"))
+    assert df.empty and invalid["missing_value"] == 2
+
+
+def test_typed_columns_use_the_schema_dtypes():
+    df, _ = schema.validate(_raw({}, {"產品名稱": "綠火焰", "採收日期": "2022-05-01"}))
+    df = schema.add_derived_columns(df)
+    assert {col: str(df[col].dtype) for col in schema.SCHEMA} == schema.SCHEMA
+    assert str(df[schema.DAYS_COLUMN].dtype) == schema.DAYS_DTYPE
+    assert list(df[schema.DAYS_COLUMN]) == [48, 59]
+    assert list(df["產品名稱"].cat.categories) == ["紅火焰", "綠火焰"]
+    assert df["種植日期"].iloc[0] == np.datetime64("2022-03-03")
@@ -0,0 +1,95 @@
+import sqlite3
+import numpy as np
+import pytest
+from utils import semantic_cache
+from utils.answer_cache import AnswerCache, answer_key, normalize_question
+from utils.semantic_cache import SemanticCache
+
+SCOPE = "scope-1"
+VECTORS = {
+    "紅火焰總數是多少": [1.0, 0.0, 0.0],
+    "有幾顆紅火焰": [0.96, 0.28, 0.0],      # similarity 0.96
+    "紅火焰一共幾顆": [0.92, 0.0, 0.39],   # similarity ~0.92
+    "紅火焰什麼時候採收": [0.0, 1.0, 0.0],  # unrelated
+}
+
+
+class FakeEmbedder:
+    def encode(self, texts):
+        return np.array([VECTORS[text] for text in texts])
+
+
+@pytest.fixture
+def semantic(tmp_path):
+    return SemanticCache(AnswerCache(str(tmp_path / "answers.sqlite")), FakeEmbedder(), threshold=0.9)
+
+
+def _store(semantic, question, answer, products=("紅火焰",), latency=2.0):
+    embedding = semantic.embed(question)
+    semantic.cache.put(answer_key(question, SCOPE), SCOPE, "v1", question, answer, latency=latency,
+                       embedding=embedding, topic=semantic.topic(products))
+
+
+def test_paraphrases_above_the_threshold_hit(semantic):
+    _store(semantic, "紅火焰總數是多少？", "共 45 顆。")
+    hit, embedding = semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])
+    assert hit["answer"] == "共 45 顆。" and hit["question"] == "紅火焰總數是多少？"
+    assert hit["similarity"] == pytest.approx(0.96, abs=1e-6)
+    np.testing.assert_allclose(embedding, VECTORS["有幾顆紅火焰"], atol=1e-6)
+    assert semantic.lookup("紅火焰什麼時候採收", SCOPE, ["紅火焰"])[0] is None
+    semantic.threshold = 0.97
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])[0] is None
+
+
+def test_topics_and_scopes_are_isolated(semantic):
+    _store(semantic, "紅火焰總數是多少", "共 45 顆。")
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["綠火焰"])[0] is None
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, [])[0] is None
+    assert semantic.lookup("有幾顆紅火焰", "scope-2", ["紅火焰"])[0] is None
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])[0] is not None
+
+
+def test_a_missing_best_match_falls_back_to_the_next_live_one(semantic):
+    semantic.threshold = 0.85
+    _store(semantic, "紅火焰一共幾顆", "一共 45 顆。")
+    _store(semantic, "紅火焰總數是多少", "共 45 顆。")
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])[0]["question"] == "紅火焰總數是多少"
+    # Evicted by another process: still in this process's index
+    with sqlite3.connect(semantic.cache.db_path) as conn:
+        conn.execute("DELETE FROM answers WHERE question = ?", ("紅火焰總數是多少",))
+    hit, _ = semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])
+    assert hit["question"] == "紅火焰一共幾顆"
+    assert hit["similarity"] == pytest.approx(0.96 * 0.92, abs=1e-3)
+
+
+def test_metrics_and_flags(semantic):
+    _store(semantic, "紅火焰總數是多少", "共 45 顆。", latency=3.0)
+    first, _ = semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"])
+    semantic.lookup("紅火焰一共幾顆", SCOPE, ["紅火焰"])
+    semantic.lookup("紅火焰什麼時候採收", SCOPE, ["紅火焰"])
+    semantic.flag(first["lookup_id"])
+    metrics = semantic.metrics()
+    assert metrics["lookups"] == 3 and metrics["hits"] == 2
+    assert metrics["hit_rate"] == pytest.approx(2 / 3) and metrics["saved_seconds"] == pytest.approx(6.0)
+    assert metrics["flagged"] == 1 and metrics["false_hit_rate"] == pytest.approx(0.5)
+    assert metrics["max_flagged_similarity"] == pytest.approx(0.96, abs=1e-6)
+
+
+def test_embedder_loads_on_first_lookup_and_failure_disables_lookups(tmp_path, monkeypatch):
+    attempts = []
+
+    def unavailable(name):
+        attempts.append(name)
+        raise OSError("offline")
+
+    monkeypatch.setattr(semantic_cache, "_load_embedder", unavailable)
+    semantic = SemanticCache(AnswerCache(str(tmp_path / "answers.sqlite")))
+    assert semantic.metrics()["lookups"] == 0 and not attempts
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"]) == (None, None)
+    assert semantic.lookup("有幾顆紅火焰", SCOPE, ["紅火焰"]) == (None, None)
+    assert len(attempts) == 1
+
+
+def test_questions_are_normalized_before_embedding(semantic):
+    assert normalize_question("有幾顆紅火焰？ ") == "有幾顆紅火焰"
+    np.testing.assert_allclose(semantic.embed("有幾顆紅火焰？ "), VECTORS["有幾顆紅火焰"], atol=1e-6)
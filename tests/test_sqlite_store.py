@@ -0,0 +1,42 @@
+import json
+import pandas as pd
+from utils.sqlite_store import ingest_source, build_store, COLUMNS
+from utils.data_loader import _build_frame, iter_source_records
+
+
+def _export(path, records):
+    path.write_text(json.dumps({"Sheet1": records}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+RECORDS = [
+    {"產品編號": 1102, "產品名稱": "紅火焰", "種植日期": "2023-01-10", "採收日期": "2023-02-25", "狀態": "種植中"},
+    {"產品編號": 1101, "產品名稱": "紅火焰", "種植日期": "2022-03-03", "採收日期": "2022-04-20", "狀態": "已採收"},
+    {"產品編號": 1103, "產品名稱": "綠橡", "種植日期": "2023-06-01", "採收日期": "2023-07-15"},
+    {"產品編號": 1103, "產品名稱": "綠橡", "種植日期": "2023-06-01", "採收日期": "2023-07-15", "狀態": "種植中"},
+    {"產品編號": "x", "產品名稱": "綠橡", "種植日期": "2023-06-01", "採收日期": "2023-07-15", "狀態": "種植中"},
+]
+
+
+def test_ingest_matches_the_loaded_frame(tmp_path):
+    first = _export(tmp_path / "a.json", RECORDS[:3])
+    second = _export(tmp_path / "b.json", RECORDS[3:])
+    store = ingest_source([first, second], str(tmp_path / "products.sqlite"), "v1")
+
+    frames = [_build_frame(iter_source_records(path))[0] for path in (first, second)]
+    df = pd.concat(frames, ignore_index=True).sort_values(["種植日期", "採收日期"], kind="stable")
+    stored = store.query()
+    assert store.data_version() == "v1"
+    assert stored[COLUMNS].astype(str).values.tolist() == df[COLUMNS].astype(str).values.tolist()
+    assert store.count() == len(df) == 3
+    assert store.count(products=["綠橡"], status="種植中") == 1
+
+
+def test_aggregates_match_pandas(tmp_path, make_frame):
+    df = make_frame([r for r in RECORDS if isinstance(r["產品編號"], int) and "狀態" in r] * 3)
+    store = build_store([df], str(tmp_path / "products.sqlite"))
+    assert store.value_counts("產品名稱").to_dict() == df["產品名稱"].value_counts().to_dict()
+    assert store.value_counts("狀態", products=["紅火焰"]).to_dict() == \
+        df.loc[df["產品名稱"] == "紅火焰", "狀態"].value_counts().loc[lambda s: s > 0].to_dict()
+    assert store.count(planted_from="2023-01-01", harvested_to="2023-03-31") == 3
+    assert store.count(products=[]) == 0
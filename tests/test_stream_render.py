@@ -0,0 +1,86 @@
+import json
+import pytest
+from utils import stream_render
+from utils.stream_render import MetricsLog, StreamRenderer
+
+
+class Clock:
+    """Stands in for the `time` module; steps are powers of two so the frame arithmetic is exact."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000 + self.now
+
+
+class Placeholder:
+    def __init__(self):
+        self.drawn = []
+
+    def markdown(self, text):
+        self.drawn.append(text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(stream_render, "time", clock)
+    return clock
+
+
+def test_deltas_are_coalesced_per_frame(clock):
+    placeholder = Placeholder()
+    renderer = StreamRenderer(placeholder, frame_seconds=1 / 16, frame_tokens=1000)
+    clock.now = 0.5
+    for i in range(100):
+        renderer.feed(f"{i} ")
+        clock.now += 1 / 64
+    metrics = renderer.finish()
+    # The first delta at once, then every fourth (1/16 s apart), then the final answer
+    assert metrics["frames"] == len(placeholder.drawn) == 1 + 24 + 1
+    assert placeholder.drawn[0] == "0 " and placeholder.drawn[-1] == "".join(f"{i} " for i in range(100))
+    assert metrics["ttft"] == 0.5 and metrics["latency"] == 0.5 + 100 / 64
+    assert metrics["tokens"] == 100 and metrics["tokens_per_second"] == 100 / (100 / 64)
+
+
+def test_bursts_are_redrawn_every_frame_tokens_deltas(clock):
+    placeholder = Placeholder()
+    renderer = StreamRenderer(placeholder, frame_seconds=1.0, frame_tokens=32)
+    for _ in range(100):
+        renderer.feed("字")
+    assert [len(text) for text in placeholder.drawn] == [1, 33, 65, 97]
+    clock.now = 2.0
+    # The backend's token count replaces the delta count; the final text replaces the deltas
+    metrics = renderer.finish("完整答案", output_tokens=150)
+    assert placeholder.drawn[-1] == "完整答案" and metrics["frames"] == 5
+    assert metrics["tokens"] == 150 and metrics["tokens_per_second"] == 75.0
+
+
+def test_no_tokens_means_no_rate(clock):
+    renderer = StreamRenderer(Placeholder(), started=-1.0)
+    metrics = renderer.finish("❌ 發生錯誤")
+    assert metrics["ttft"] is None and metrics["latency"] == 1.0 and metrics["tokens_per_second"] is None
+
+
+def test_summary_percentiles_over_recent_answers(tmp_path, clock):
+    log = MetricsLog(str(tmp_path / "logs" / "metrics.jsonl"), keep=20)
+    log.record({"ttft": 100.0, "latency": 100.0, "tokens_per_second": 1.0})  # pushed out by keep=20
+    for i in range(1, 21):
+        log.record({"ttft": float(i), "latency": 10.0 * i, "tokens_per_second": None if i == 20 else float(i)})
+    summary = log.summary()
+    assert summary["count"] == 20
+    assert summary["ttft_p50"] == 10.5 and summary["ttft_p95"] == pytest.approx(19.05)
+    assert summary["latency_p50"] == 105.0 and summary["latency_p95"] == pytest.approx(190.5)
+    assert summary["tokens_per_second_p50"] == 10.0
+    assert summary["last"]["ttft"] == 20.0
+    lines = (tmp_path / "logs" / "metrics.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 21 and json.loads(lines[0])["ttft"] == 100.0
+
+
+def test_empty_summary(tmp_path):
+    summary = MetricsLog(str(tmp_path / "metrics.jsonl")).summary()
+    assert summary["count"] == 0 and summary["ttft_p50"] is None and summary["last"] is None
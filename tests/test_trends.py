@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.trends import lttb, downsample
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (1000, 50), (1001, 500), (5000, 999), (3650, 730)])
+def test_keeps_threshold_points_including_the_ends(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n) * 86_400
+    y = rng.poisson(20, n)
+    x_kept, y_kept = lttb(x, y, threshold)
+    assert len(x_kept) == len(y_kept) == threshold
+    assert (x_kept[0], x_kept[-1]) == (x[0], x[-1])
+    assert (np.diff(x_kept) > 0).all()
+    # Every kept point is an original point
+    assert (y[np.searchsorted(x, x_kept)] == y_kept).all()
+
+
+def test_short_series_and_tiny_thresholds_are_unchanged():
+    x, y = np.arange(5), np.array([3, 1, 4, 1, 5])
+    for threshold in (2, 5, 10):
+        x_kept, y_kept = lttb(x, y, threshold)
+        assert x_kept is x and y_kept is y
+
+
+def test_peaks_and_troughs_survive():
+    rng = np.random.default_rng(0)
+    n = 10_000
+    y = rng.normal(100, 1, n)
+    peaks, troughs = [1234, 4567, 8901], [2500, 7000]
+    y[peaks] = 1000
+    y[troughs] = -1000
+    x_kept, y_kept = lttb(np.arange(n), y, 200)
+    assert set(peaks + troughs) <= set(x_kept.tolist())
+    assert y_kept.max() == y.max() and y_kept.min() == y.min()
+
+
+def test_downsample_keeps_the_date_index():
+    index = pd.date_range("2022-01-01", periods=2000, freq="D")
+    series = pd.Series(np.sin(np.arange(2000) / 50) * 10 + 20, index=index, name="種植")
+    small = downsample(series, 300)
+    assert len(small) == 300 and small.name == "種植"
+    assert isinstance(small.index, pd.DatetimeIndex)
+    assert small.index[0] == index[0] and small.index[-1] == index[-1]
+    assert (series.loc[small.index].to_numpy() == small.to_numpy()).all()
+    assert downsample(series, 5000) is series
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_downsample_keeps_dates_in_any_resolution(unit):
+    index = pd.date_range("2022-01-01", periods=2000, freq="D").as_unit(unit)
+    series = pd.Series(np.arange(2000.0), index=index)
+    assert downsample(series, 100).index.isin(index).all()
@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import unicodedata
+from contextlib import closing
+import streamlit as st
+from utils.frame_cache import CACHE_DIR
+
+# Model answers are kept on disk so they survive restarts and are shared by all
+# sessions and processes on the host
+ANSWER_CACHE_PATH = os.path.join(CACHE_DIR, "answers.sqlite")
+ANSWER_TTL_SECONDS = int(float(os.getenv("CESTLAVIE_ANSWER_TTL_HOURS", "24")) * 3600)
+ANSWER_CACHE_ENTRIES = int(os.getenv("CESTLAVIE_ANSWER_CACHE_ENTRIES", "5000"))
+# Bump when the table layout changes; older tables are dropped (it is only a cache)
+ANSWER_CACHE_LAYOUT = 2
+
+_TRAILING_PUNCTUATION = "?？!！。.,，~～ "
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: full/half-width folded, lower-cased, whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+
+# Questions that lean on the previous turns: "那綠火焰呢？", "它的採收期？", "上面那批…"
+_FOLLOW_UP = re.compile(r"^(那|那麼|還有|另外|然後)|呢$|[它牠]|[這那](個|些|種|批)|上(面|述)|剛(剛|才)|前面")
+
+
+def is_follow_up(question, products=()) -> bool:
+    """Whether the answer depends on the conversation: the question names no product
+    (`products` as matched by the keyword matcher) or refers back to earlier turns."""
+    return not products or bool(_FOLLOW_UP.search(normalize_question(question)))
+
+
+def answer_scope(model, temperature, data_version, with_summary, context=()) -> str:
+    """Everything besides the question that shapes an answer; a new data version is a new scope.
+
+    `context` is the conversation sent before the question (system message with
+    the running summary, recent turns). Callers pass it only for follow-ups
+    (`is_follow_up`), so "那綠火焰呢？" only matches answers given after the same
+    conversation while a self-contained question is reused across turns and sessions.
+    """
+    parts = [model, float(temperature), str(data_version), bool(with_summary),
+             [[m["role"], m["content"]] for m in context]]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def answer_key(question, scope) -> str:
+    """Cache key of one model call."""
+    return hashlib.sha256(f"{scope}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Model answers in SQLite with a time-to-live and a bound on the number of entries.
+
+    Every call opens its own connection, so one cache can be shared by all
+    sessions and threads; WAL mode lets readers run while an answer is written.
+    Entries may carry a question embedding for the semantic cache.
+    """
+
+    def __init__(self, db_path=ANSWER_CACHE_PATH, ttl=ANSWER_TTL_SECONDS, max_entries=ANSWER_CACHE_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != ANSWER_CACHE_LAYOUT:
+                conn.execute("DROP TABLE IF EXISTS answers")
+                conn.execute(f"PRAGMA user_version = {ANSWER_CACHE_LAYOUT}")
+            # AUTOINCREMENT ids are never reused, so readers can follow new entries by id
+            conn.execute("CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "key TEXT UNIQUE, data_version TEXT, scope TEXT, topic TEXT, question TEXT, "
+                         "answer TEXT, embedding BLOB, latency REAL, created REAL, last_used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.db_path, timeout=5, check_same_thread=False))
+
+    def get(self, key):
+        """`{"question", "answer", "latency"}` for `key`, or None when missing or expired."""
+        now = time.time()
+        with self._connect() as conn, conn:
+            row = conn.execute("SELECT question, answer, latency FROM answers WHERE key = ? AND created > ?",
+                               (key, now - self.ttl)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        return dict(zip(("question", "answer", "latency"), row)) if row else None
+
+    def put(self, key, scope, data_version, question, answer, latency=None, embedding=None, topic=""):
+        """Store an answer, then drop expired entries, answers for other data
+        versions and the least recently used entries beyond `max_entries`.
+
+        `latency` is how long the model took, i.e. the time a later hit saves.
+        """
+        now = time.time()
+        blob = None if embedding is None else embedding.astype("float32").tobytes()
+        with self._connect() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO answers (key, data_version, scope, topic, question, answer, "
+                         "embedding, latency, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, str(data_version), scope, topic, question, answer, blob, latency, now, now))
+            conn.execute("DELETE FROM answers WHERE created <= ? OR data_version != ?",
+                         (now - self.ttl, str(data_version)))
+            conn.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers "
+                         "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def embeddings_since(self, last_id):
+        """`(id, key, scope, topic, embedding bytes)` of entries with embeddings added after `last_id`."""
+        with self._connect() as conn:
+            return conn.execute("SELECT id, key, scope, topic, embedding FROM answers "
+                                "WHERE id > ? AND embedding IS NOT NULL ORDER BY id", (last_id,)).fetchall()
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """The process-wide answer cache."""
+    return AnswerCache()
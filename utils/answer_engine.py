@@ -0,0 +1,266 @@
+import re
+import pandas as pd
+from utils.schema import DAYS_COLUMN
+from utils.keyword_matcher import get_postings
+from utils.sqlite_store import get_store
+
+# Open-ended questions always go to the LLM, even if they mention counts or dates
+OPEN_ENDED_WORDS = ("為什麼", "為何", "如何", "怎麼", "怎樣", "建議", "原因", "預測", "應該", "會不會", "比較好")
+
+PRICE_WORDS = ("價格", "單價", "售價", "價錢")
+WEIGHT_WORDS = ("公斤", "公克", "斤", "重量")
+COUNT_WORDS = ("多少", "幾顆", "幾株", "幾棵", "幾片", "幾筆", "有幾", "共有", "總數", "總計", "總和", "總量", "數量")
+UNIT_WORDS = ("顆", "株", "棵", "片")
+MOST_WORDS = ("最多", "大部分", "大多數", "多數", "最常見")
+LEAST_WORDS = ("最少",)
+EARLIEST_WORDS = ("最早",)
+LATEST_WORDS = ("最晚", "最新", "最近")
+DISTRIBUTION_WORDS = ("分佈", "分布")
+DISTINCT_WORDS = ("幾種", "多少種", "幾個編號", "多少個編號", "幾個不同", "多少個不同")
+# Growing-day statistics, checked in order
+DAY_STAT_WORDS = [
+    ("中位數", "median", "中位數"),
+    ("標準差", "std", "標準差"),
+    ("平均", "mean", "平均"),
+    ("最大值", "max", "最長"),
+    ("最長", "max", "最長"),
+    ("最小值", "min", "最短"),
+    ("最短", "min", "最短"),
+]
+
+# Constraints the router can't apply (time windows, per-period rates, numeric thresholds):
+# answering without them would return the all-time total, so these go to the LLM
+_UNSUPPORTED = re.compile(
+    r"\d{4}\s*年|\d{4}[-/.]\d{1,2}|\d{1,2}\s*個?月|[一二兩三四五六七八九十幾]+\s*個?月|\d+\s*(?:天|日|週|周|星期)前"
+    r"|今年|去年|前年|明年|本月|上月|上個月|下個月|這個月|本週|本周|這週|這周|上週|上周|上星期|本季|上季"
+    r"|今天|昨天|前天|(?:最近|近|過去|前)\s*(?:\d+|[一二兩三幾半])\s*(?:天|日|週|周|個月|月|年|季)"
+    r"|每\s*個?(?:天|日|週|周|星期|月|季|年)|[日週周月年]平均"
+    r"|超過|以上|以下|少於|多於|大於|小於|不到|至少|至多"
+)
+_PRODUCT_ID = re.compile(r"產品編號\s*(?:為|是|=|:|：)?\s*(\d+)")
+_TOP_K = re.compile(r"(\d+|[一二兩三四五六七八九十])\s*(?:種|個|項|名|樣)")
+_CHINESE_DIGITS = {"一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+
+def _has(question, words):
+    return any(word in question for word in words)
+
+
+def _top_k(question):
+    match = _TOP_K.search(question)
+    if not match:
+        return 1
+    value = match.group(1)
+    return int(value) if value.isdigit() else _CHINESE_DIGITS[value]
+
+
+def route_question(question, match_products, statuses=()):
+    """Classify an exact-aggregate question, or return None for the LLM.
+
+    `match_products` maps the question to the product keywords it mentions.
+    The route is a dict with `intent` plus the filters found in the
+    question: `products`, `product_id`, `status`, `date_col`, `k`, `unit`.
+    """
+    question = question.strip()
+    if not question or _has(question, OPEN_ENDED_WORDS) or _UNSUPPORTED.search(question):
+        return None
+
+    id_match = _PRODUCT_ID.search(question)
+    route = {
+        "products": match_products(question),
+        "product_id": int(id_match.group(1)) if id_match else None,
+        "status": next((status for status in statuses if status in question), None),
+        "date_col": "採收日期" if "採收" in question else "種植日期",
+        "k": _top_k(question),
+        "unit": next((unit for unit in UNIT_WORDS if unit in question), "筆"),
+    }
+
+    if _has(question, PRICE_WORDS):
+        intent = "no_price"
+    elif _has(question, WEIGHT_WORDS) and _has(question, COUNT_WORDS):
+        intent = "no_weight"
+    elif route["product_id"] is not None and "狀態" not in question:
+        intent = "id_products"
+    elif "產品編號" in question and route["products"]:
+        intent = "id_range"
+    elif _has(question, EARLIEST_WORDS):
+        intent = "earliest"
+    elif _has(question, LATEST_WORDS):
+        intent = "latest"
+    elif _has(question, DISTRIBUTION_WORDS) and "種植時間" in question:
+        intent = "day_distribution"
+    elif _has(question, MOST_WORDS) and "狀態" in question:
+        intent = "top_status"
+    elif _has(question, MOST_WORDS + LEAST_WORDS) and ("產品" in question or "種" in question):
+        intent = "bottom_products" if _has(question, LEAST_WORDS) else "top_products"
+    elif "狀態" in question:
+        intent = "status"
+    elif _has(question, DISTINCT_WORDS):
+        intent = "distinct"
+        route["distinct_col"] = "產品編號" if "編號" in question else "產品名稱"
+    elif "種植時間" in question and "哪" in question:
+        # "Which product grows longest" needs a ranking, not a single statistic
+        return None
+    elif "種植時間" in question and any(word in question for word, _, _ in DAY_STAT_WORDS):
+        word, stat, label = next(item for item in DAY_STAT_WORDS if item[0] in question)
+        intent = "day_stat"
+        route.update(stat=stat, stat_label=label)
+    elif _has(question, COUNT_WORDS):
+        intent = "count"
+    else:
+        return None
+    route["intent"] = intent
+    return route
+
+
+def _filters(postings, route):
+    """The route's row filters, in `ProductStore` terms, plus a label describing them."""
+    products = route["products"]
+    product_id = route["product_id"]
+    status = route["status"] if route["intent"] not in ("status", "top_status") else None
+    labels = []
+    if products:
+        labels.append("、".join(products))
+    if product_id is not None:
+        labels.append(f"產品編號 {product_id}")
+    if status is not None:
+        labels.append(f"狀態為{status}")
+    names = [name for keyword in products for name in postings.names_for(keyword)] if products else None
+    return {"products": names, "product_id": product_id, "status": status}, "，".join(labels)
+
+
+def _filter(df, postings, route, store=None):
+    """Rows selected by the route's filters plus a label describing them."""
+    filters, label = _filters(postings, route)
+    if store is not None and label:
+        # Indexed read from SQLite instead of filtering the in-memory frame
+        return store.query(**filters), label
+    rows = postings.take(route["products"]) if route["products"] else df
+    if filters["product_id"] is not None:
+        rows = rows[rows["產品編號"] == filters["product_id"]]
+    if filters["status"] is not None:
+        rows = rows[rows["狀態"] == filters["status"]]
+    return rows, label
+
+
+def _tally(df, postings, route, store=None, column=None):
+    """Number of selected rows, or their counts per value of `column` (largest first).
+
+    With a store the aggregate runs in SQLite and no rows are read into pandas.
+    """
+    if store is not None:
+        filters, _ = _filters(postings, route)
+        if column is None:
+            return store.count(**filters)
+        counts = store.value_counts(column, **filters)
+    else:
+        rows, _ = _filter(df, postings, route)
+        if column is None:
+            return len(rows)
+        counts = rows[column].value_counts()
+    # Ties ordered by value, so both backends list them the same way
+    counts = counts[counts > 0].sort_index(key=lambda index: index.astype(str))
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def _date(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def answer_question(df: pd.DataFrame, question: str):
+    """Answer count/min/max/mean/median/earliest/latest/top-k questions from the data.
+
+    Returns the answer text, or None when the question should go to the LLM.
+    """
+    if df is None or df.empty:
+        return None
+    postings = get_postings(df)
+    statuses = [str(value) for value in df["狀態"].unique()]
+    route = route_question(question, postings.match, statuses)
+    if route is None:
+        return None
+
+    intent = route["intent"]
+    if intent == "no_price":
+        return "資料中沒有價格相關欄位（只有產品編號、產品名稱、種植日期、採收日期、狀態），無法得知價格。"
+    if intent == "no_weight":
+        return "資料中沒有重量欄位，無法以斤／公斤計算；每一筆記錄代表一顆產品，可改問數量。"
+
+    store = get_store(df)
+    _, label = _filters(postings, route)
+    subject = label or "全部資料"
+    nothing = f"資料中沒有符合條件的記錄（{subject}）。"
+
+    # Counts and per-value tallies never need the rows themselves
+    if intent == "count":
+        total = _tally(df, postings, route, store)
+        if not total:
+            return nothing
+        if len(route["products"]) > 1:
+            per_product = "、".join(f"{name} {_tally(df, postings, {**route, 'products': [name]}, store)} {route['unit']}"
+                                    for name in route["products"])
+            return f"{per_product}，合計 {total} {route['unit']}。"
+        return f"{subject}共有 {total} {route['unit']}。"
+
+    tally_columns = {"distinct": route.get("distinct_col"), "id_products": "產品名稱", "top_products": "產品名稱",
+                     "bottom_products": "產品名稱", "top_status": "狀態", "status": "狀態"}
+    if intent in tally_columns:
+        counts = _tally(df, postings, route, store, tally_columns[intent])
+        if counts.empty:
+            return nothing
+
+    if intent == "distinct":
+        if route["distinct_col"] == "產品編號":
+            return f"{subject}共有 {len(counts)} 個不同的產品編號（{counts.sum()} 筆）。"
+        return f"{subject}共有 {len(counts)} 種產品：{'、'.join(str(name) for name in counts.index)}。"
+
+    if intent == "id_products":
+        listed = "、".join(f"{name}（{count} 筆）" for name, count in counts.head(10).items())
+        more = f"等，共 {len(counts)} 種產品" if len(counts) > 10 else ""
+        return f"產品編號為 {route['product_id']} 的產品包含：{listed}{more}。"
+
+    if intent in ("top_products", "bottom_products"):
+        counts = counts.sort_values(ascending=intent == "bottom_products", kind="stable")
+        picked = counts.head(route["k"])
+        word = "最多" if intent == "top_products" else "最少"
+        listed = "、".join(f"{name}（{count} 筆）" for name, count in picked.items())
+        return f"統計{word}的產品是：{listed}。"
+
+    if intent == "top_status":
+        share = counts.iloc[0] / counts.sum() * 100
+        return f"{subject}大部分的產品狀態是{counts.index[0]}（{counts.iloc[0]} 筆，佔 {share:.1f}%）。"
+
+    if intent == "status":
+        listed = "、".join(f"{status} {count} 筆" for status, count in counts.items())
+        return f"{subject}的產品狀態：{listed}。"
+
+    rows, _ = _filter(df, postings, route, store)
+    if rows.empty:
+        return nothing
+
+    if intent == "id_range":
+        ids = rows["產品編號"]
+        return (f"{subject}的產品編號從 {ids.min()} 到 {ids.max()} 都有分佈"
+                f"（共 {ids.nunique()} 個不同編號，{len(rows)} 筆）。")
+
+    if intent in ("earliest", "latest"):
+        col = route["date_col"]
+        target = rows[col].min() if intent == "earliest" else rows[col].max()
+        hits = rows[rows[col] == target]
+        first = hits.iloc[0]
+        word = "最早" if intent == "earliest" else "最晚"
+        kind = "採收" if col == "採收日期" else "種植"
+        extra = f"（當天共 {len(hits)} 筆）" if len(hits) > 1 else ""
+        return (f"{subject}中{word}的{kind}資料是 {_date(target)}：產品編號 {first['產品編號']}，"
+                f"{first['產品名稱']}，種植日期 {_date(first['種植日期'])}，採收日期 {_date(first['採收日期'])}，"
+                f"狀態為{first['狀態']}{extra}。")
+
+    days = rows[DAYS_COLUMN]
+    if intent == "day_stat":
+        value = getattr(days, route["stat"])()
+        return f"{subject}的種植時間{route['stat_label']}是 {value:.1f} 天（{len(rows)} 筆）。"
+
+    quantiles = days.quantile([0.25, 0.5, 0.75])
+    return (f"{subject}的種植時間分佈在 {days.min()} 到 {days.max()} 天之間，"
+            f"中位數 {quantiles[0.5]:.0f} 天，一半的資料落在 {quantiles[0.25]:.0f}～{quantiles[0.75]:.0f} 天，"
+            f"最常見為 {days.mode().iloc[0]} 天（{len(rows)} 筆）。")
@@ -0,0 +1,129 @@
+import os
+import re
+import importlib.util
+
+# Input-token budget of one chat request: rules, running summary, data summary,
+# recent turns and the question together
+CONTEXT_TOKENS = int(os.getenv("CESTLAVIE_CONTEXT_TOKENS", "3000"))
+# Share of the budget the data summary may use; the conversation gets the rest
+DATA_SHARE = 0.5
+# Cap on the running summary of turns that no longer fit verbatim
+SUMMARY_TOKENS = 300
+# Characters kept per question / answer when a turn is folded into the summary
+FOLD_QUESTION_CHARS = 40
+FOLD_ANSWER_CHARS = 80
+TOKEN_ENCODING = "o200k_base"  # gpt-4o family
+
+SYSTEM_RULES = (
+    "你是沙拉米農場的種植資料助理。請以繁體中文簡潔回答。"
+    "數字請以[資料摘要]為準；摘要沒有的資訊請直接說明資料中沒有，不要猜測。"
+)
+
+# tiktoken is optional: without it token counts are estimated
+HAS_TIKTOKEN = importlib.util.find_spec("tiktoken") is not None
+_encoding = None
+_CJK = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` for the chat model; a CJK-aware estimate without tiktoken."""
+    global _encoding
+    if not text:
+        return 0
+    if HAS_TIKTOKEN:
+        if _encoding is None:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        return len(_encoding.encode(text))
+    # About one token per CJK character and per four other characters
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _message_tokens(message) -> int:
+    # Each message carries a few tokens of role / separator overhead
+    return count_tokens(message["content"]) + 4
+
+
+def fit_lines(text: str, budget: int) -> str:
+    """Leading lines of `text` that fit in `budget` tokens."""
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def _clip(text: str, chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= chars else text[:chars] + "…"
+
+
+def fold_turns(summary: str, messages) -> str:
+    """Running summary with `messages` appended as one clipped line per turn.
+
+    Extractive, so folding costs no model call; the oldest lines are dropped
+    once the summary exceeds SUMMARY_TOKENS.
+    """
+    lines = summary.splitlines() if summary else []
+    question = None
+    for message in messages:
+        if message["role"] == "user":
+            question = _clip(message["content"], FOLD_QUESTION_CHARS)
+        else:
+            lines.append(f"問：{question or '（略）'} → 答：{_clip(message['content'], FOLD_ANSWER_CHARS)}")
+            question = None
+    if question:
+        lines.append(f"問：{question}")
+    while lines and count_tokens("\n".join(lines)) > SUMMARY_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def build_context(question, data_summary="", history=(), running_summary="", budget=CONTEXT_TOKENS):
+    """Messages for one model call and their token accounting.
+
+    Packs, in priority order: the system rules, the question, the data
+    summary (up to DATA_SHARE of the budget, whole lines), then as many of the
+    most recent `history` messages as still fit. Older messages are folded,
+    together with `running_summary`, into a compact summary in the system
+    message. Returns `(messages, tokens)` where `tokens` breaks the estimate
+    down by part.
+    """
+    user_content = question
+    data_tokens = 0
+    if data_summary:
+        fitted = fit_lines(data_summary, int(budget * DATA_SHARE))
+        if fitted:
+            user_content = f"{question}\n\n[資料摘要]\n{fitted}"
+            data_tokens = count_tokens(fitted)
+    user_message = {"role": "user", "content": user_content}
+    used = count_tokens(SYSTEM_RULES) + 4 + _message_tokens(user_message)
+
+    # Newest turns first, reserving room for the summary of whatever doesn't fit
+    remaining = budget - used - SUMMARY_TOKENS
+    recent = []
+    for message in reversed(history):
+        cost = _message_tokens(message)
+        if cost > remaining:
+            break
+        recent.append({"role": message["role"], "content": message["content"]})
+        remaining -= cost
+    recent.reverse()
+    older = list(history)[:len(history) - len(recent)]
+    summary = fold_turns(running_summary, older) if older else running_summary
+
+    system = SYSTEM_RULES + (f"\n\n[先前對話摘要]\n{summary}" if summary else "")
+    messages = [{"role": "system", "content": system}, *recent, user_message]
+    tokens = {
+        "system": count_tokens(system) + 4,
+        "history": sum(_message_tokens(m) for m in recent),
+        "data": data_tokens,
+        "total": sum(_message_tokens(m) for m in messages),
+        "turns": len(recent),
+        "estimated": not HAS_TIKTOKEN,
+    }
+    return messages, tokens
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# product × planting month × harvest month × status. Harvest month is kept
+# as a dimension so the chart filter (planted from / harvested by) stays exact.
+DIMENSIONS = ["產品名稱", "種植月", "採收月", "狀態"]
+MEASURES = ["count", "days_sum", "days_sq_sum"]
+
+
+def _month(dates):
+    """First day of each date's month, vectorized."""
+    return dates.to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate rows into count, sum and sum of squares of growing days."""
+    days = df["種植時間（日）"].to_numpy(dtype=np.int64)
+    rows = pd.DataFrame({
+        "產品名稱": df["產品名稱"],
+        "種植月": _month(df["種植日期"]),
+        "採收月": _month(df["採收日期"]),
+        "狀態": df["狀態"],
+        "count": 1,
+        "days_sum": days,
+        "days_sq_sum": days * days,
+    })
+    cube = rows.groupby(DIMENSIONS, observed=True, sort=False)[MEASURES].sum().reset_index()
+    cube.attrs["data_version"] = df.attrs.get("data_version")
+    return cube
+
+
+@st.cache_resource(max_entries=2)
+def _cached_cube(data_version, _df):
+    return build_cube(_df)
+
+
+def get_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """The cube for `df`, built once per data version and shared by all sessions."""
+    return _cached_cube(df.attrs.get("data_version"), df)
+
+
+def slice_months(cube: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Cube cells planted from `start`'s month and harvested by `end`'s month."""
+    start = pd.Timestamp(start).to_period("M").to_timestamp()
+    end = pd.Timestamp(end).to_period("M").to_timestamp()
+    return cube[(cube["種植月"] >= start) & (cube["採收月"] <= end)]
+
+
+def rollup(cube: pd.DataFrame, by) -> pd.DataFrame:
+    """Sum cells over `by` and derive mean / std of growing days."""
+    out = cube.groupby(by, observed=True)[MEASURES].sum()
+    out = out[out["count"] > 0]
+    out["mean_days"] = out["days_sum"] / out["count"]
+    variance = out["days_sq_sum"] / out["count"] - out["mean_days"] ** 2
+    out["std_days"] = np.sqrt(variance.clip(lower=0))
+    return out
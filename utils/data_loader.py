@@ -1,40 +1,471 @@
 import pandas as pd
+import numpy as np
 import os
+import re
 import json
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import streamlit as st
+from utils import schema
+from utils.stats import compute_stats, merge_stats
+from utils.sketches import hll_registers
+from utils.frame_cache import (source_fingerprint, read_cached_frame, write_cached_frame,
+                               open_shared_frame, share_frame)
 
-@st.cache_data
-def load_data():
+# A single export file (.json or the original .xlsx), or a directory of partition files (per month, greenhouse, ...)
+DATA_PATH = os.getenv("CESTLAVIE_DATA_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../Data/merged_product_data_sorted_json.json")
+PARTITION_SUFFIXES = (".json", ".xlsx")
+# Worker processes used to parse partitions in parallel
+MAX_WORKERS = os.cpu_count() or 1
+
+# Records per validation/conversion chunk; bounds the raw dicts held at once
+CHUNK_ROWS = 50_000
+# Characters read from disk per refill of the streaming buffer
+READ_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class _Stream:
+    """Growable text buffer over a file, refilled on demand."""
+
+    def __init__(self, file):
+        self.file = file
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        data = self.file.read(READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer only holds the unparsed tail
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def skip_ws(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self):
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON 格式錯誤：預期 '{char}'，位置 {self.pos}")
+        self.pos += 1
+
+    def items(self, decoder):
+        """Yield the elements of the JSON array starting at the current position."""
+        self.expect("[")
+        while self.peek() != "]":
+            yield from self._batch(decoder)
+            separator = self.peek()
+            if separator == ",":
+                self.pos += 1
+            elif separator != "]":
+                raise ValueError(f"JSON 格式錯誤：預期 ',' 或 ']'，位置 {self.pos}")
+        self.pos += 1
+
+    def _batch(self, decoder):
+        """Decode every complete element already buffered with a single C-level call."""
+        end = self.buf.rfind("}", self.pos)
+        for _ in range(2):
+            if end < self.pos:
+                break
+            try:
+                batch = json.loads("[" + self.buf[self.pos:end + 1] + "]")
+            except json.JSONDecodeError as e:
+                # Retry up to the last element that closed before the failure point
+                end = self.buf.rfind("}", self.pos, self.pos + e.pos - 1)
+                continue
+            self.pos = end + 1
+            return batch
+        return [self.decode(decoder)]
+
+    def decode(self, decoder):
+        """Decode the next complete JSON value, reading more text as needed."""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A value running to the end of the buffer (e.g. a number) may be cut short
+            if end < len(self.buf) or self.eof or not self.fill():
+                self.pos = end
+                return value
+
+
+def iter_sheet1_records(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield lists of raw `Sheet1` records without loading the whole JSON."""
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as file:
+        stream = _Stream(file)
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.decode(decoder)
+            stream.expect(":")
+            if key != "Sheet1":
+                stream.decode(decoder)  # other sheets are not used
+            else:
+                chunk = []
+                for record in stream.items(decoder):
+                    chunk.append(record)
+                    if len(chunk) >= chunk_rows:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+                return
+            if stream.peek() == ",":
+                stream.pos += 1
+        raise KeyError("Sheet1")
+
+
+def iter_xlsx_records(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield lists of `Sheet1` row dicts from an .xlsx, streaming rows in read-only mode."""
+    # Only the original .xlsx needs openpyxl; JSON exports never load it
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(current_dir, "../Data/merged_product_data_sorted_json.json")
+        if "Sheet1" not in workbook.sheetnames:
+            raise KeyError("Sheet1")
+        rows = workbook["Sheet1"].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = [(i, name) for i, name in enumerate(header) if name is not None]
+        chunk = []
+        for row in rows:
+            record = {name: row[i] for i, name in columns if i < len(row) and row[i] is not None}
+            if record:  # skip blank rows left at the end of the sheet
+                chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
 
-        if not os.path.exists(file_path):
-            st.error(f"❌ 找不到檔案: {file_path}")
-            return None
 
-        with open(file_path, "r", encoding="utf-8") as file:
-            json_data = json.load(file)
+def iter_source_records(file_path, chunk_rows=CHUNK_ROWS):
+    """Stream `Sheet1` record chunks from a JSON export or the original .xlsx."""
+    if file_path.lower().endswith(".xlsx"):
+        return iter_xlsx_records(file_path, chunk_rows)
+    return iter_sheet1_records(file_path, chunk_rows)
 
-        required_columns = ["產品編號", "產品名稱", "種植日期", "採收日期", "狀態"]
-        if 'Sheet1' not in json_data:
-            st.error("❌ JSON 格式錯誤：找不到 'Sheet1' 欄位")
-            return None
 
-        valid_records = [record for record in json_data['Sheet1']
-                         if all(col in record for col in required_columns)]
+def _row_keys(raw):
+    """Content hash per raw record; identical records share a key."""
+    return pd.util.hash_pandas_object(raw[sorted(raw.columns)], index=False).to_numpy()
+
+
+def _typed_chunk(raw):
+    """Validate and type one raw chunk, deriving columns for its rows only."""
+    df, invalid = schema.validate(raw)
+    if not df.empty:
+        schema.add_derived_columns(df)
+    return df, invalid
+
+
+def _assemble(parts):
+    """Concatenate typed frames column by column, releasing parts as it goes."""
+    columns = dict.fromkeys(key for part in parts for key in part.columns)
+    df = pd.DataFrame(index=pd.RangeIndex(sum(len(part) for part in parts)))
+    for key in columns:
+        df[key] = schema.concat_column([
+            part.pop(key) if key in part.columns else pd.Series([None] * len(part))
+            for part in parts
+        ])
+    return df
+
+
+def _build_frame(chunks, previous=None):
+    """Build the typed frame from streamed record chunks.
+
+    With `previous=(df, keys)`, records whose content key already exists in
+    the previous frame are taken from it as-is; only new or changed records
+    are validated and typed. Reused rows keep their previous order and new
+    rows are appended after them. Returns `(df, keys, reused)`, where
+    `reused` are the previous-frame positions of the leading rows, or
+    `(None, None, None)` when no record is valid.
+    """
+    invalid = {reason: 0 for reason in schema.INVALID_REASONS}
+    parts, new_keys, reused = [], [], []
+    if previous is not None:
+        prev_df, prev_keys = previous
+        order = np.argsort(prev_keys, kind="stable")
+        sorted_keys = prev_keys[order]
+
+    for records in chunks:
+        # object dtype keeps raw values as parsed, so keys don't depend on chunk dtype inference
+        raw = pd.DataFrame(records, dtype=object)
+        keys = _row_keys(raw)
+        if previous is not None and len(sorted_keys):
+            slot = np.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+            known = sorted_keys[slot] == keys
+            reused.append(order[slot[known]])
+            raw, keys = raw.loc[~known], keys[~known]
+        # Keys ride along as a column so they stay aligned with the rows validate() keeps
+        df, chunk_invalid = _typed_chunk(raw.assign(_row_key=keys))
+        for reason, count in chunk_invalid.items():
+            invalid[reason] += count
+        if not df.empty:
+            new_keys.append(df.pop("_row_key").to_numpy())
+            parts.append(df)
+
+    reused = np.concatenate(reused) if reused else np.empty(0, dtype=np.intp)
+    if len(reused):
+        parts.insert(0, prev_df.take(reused).reset_index(drop=True))
+        new_keys.insert(0, prev_keys[reused])
+    if not parts:
+        return None, None, None
+
+    df = _assemble(parts)
+    df.attrs["invalid_rows"] = invalid
+    if previous is not None:
+        df.attrs["delta"] = {"parent": prev_df.attrs.get("data_version"),
+                             "reused": len(reused), "added": len(df) - len(reused)}
+    return df, np.concatenate(new_keys), reused
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def discover_partitions(data_dir):
+    """Partition files under `data_dir` (recursively), in sorted path order."""
+    paths = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        paths.extend(os.path.join(root, name) for name in files
+                     if name.endswith(PARTITION_SUFFIXES) and not name.startswith((".", "~$")))
+    # os.walk lists a directory's files before its subdirectories: sort the whole paths
+    return sorted(paths)
+
 
-        if not valid_records:
-            st.error("❌ 沒有符合要求的資料記錄")
+def _date_order(planting, harvest, keys):
+    """Permutation sorting rows by planting date, then harvest date, then row key.
+
+    The row key breaks ties, so the order depends only on the records and not
+    on whether the frame was parsed in full or updated incrementally.
+    """
+    return np.lexsort((keys, harvest, planting))
+
+
+def _sort_by_date(df, keys):
+    """Sort a frame (and its row keys) by planting date for binary-search range lookups."""
+    order = _date_order(df["種植日期"].to_numpy(), df["採收日期"].to_numpy(), keys)
+    if (order[1:] > order[:-1]).all():
+        return df, keys
+    return df.take(order).reset_index(drop=True), keys[order]
+
+
+def _delta_stats(previous_df, previous_stats, df, reused):
+    """Update the previous frame's statistics to `df` without rescanning reused rows.
+
+    Each previous row is weighted by how many times it was reused minus one:
+    -1 for dropped rows, +k for rows duplicated k more times. Rows after the
+    reused ones are new and are counted as-is.
+    """
+    weights = np.bincount(reused, minlength=len(previous_df)) - 1
+    changed = np.flatnonzero(weights)
+    delta = compute_stats(previous_df.take(changed), weights[changed])
+    stats = merge_stats(previous_stats, delta, compute_stats(df.iloc[len(reused):]))
+    if (weights < 0).any():
+        # Dropped rows can't be taken out of the HyperLogLog registers: rebuild them
+        stats["id_hll"] = hll_registers(df)
+    return stats
+
+
+def load_partition(file_path, previous=None, previous_stats=None):
+    """Load one source file into `{stamp, fingerprint, df, keys, stats}`.
+
+    Uses the Feather cache when it matches the file content; otherwise parses
+    the file, incrementally against `previous=(df, keys)` when given, in which
+    case `previous_stats` are updated rather than recomputed. Frames come back
+    sorted by planting date. Also runs in worker processes, so it must not
+    call Streamlit.
+    """
+    stamp = _stamp(file_path)
+    fingerprint = source_fingerprint(file_path)
+    if previous is not None and previous[0].attrs.get("data_version") == fingerprint["digest"]:
+        return {"stamp": stamp, "fingerprint": fingerprint, "df": previous[0], "keys": previous[1],
+                "stats": previous_stats if previous_stats is not None else compute_stats(previous[0])}
+    if previous is None:
+        cached = read_cached_frame(file_path, fingerprint)
+        if cached is not None and "_row_key" in cached.columns:
+            keys = cached.pop("_row_key").to_numpy()
+            return {"stamp": stamp, "fingerprint": fingerprint, "df": cached, "keys": keys,
+                    "stats": compute_stats(cached)}
+
+    try:
+        df, keys, reused = _build_frame(iter_source_records(file_path), previous)
+    except KeyError:
+        raise ValueError(f"❌ 資料格式錯誤：找不到 'Sheet1'（{file_path}）")
+    if df is None:
+        raise ValueError(f"❌ 沒有符合要求的資料記錄（{file_path}）")
+    if previous is not None and previous_stats is not None:
+        stats = _delta_stats(previous[0], previous_stats, df, reused)
+    else:
+        stats = compute_stats(df)
+    df, keys = _sort_by_date(df, keys)
+    df.attrs["data_version"] = fingerprint["digest"]
+    write_cached_frame(file_path, fingerprint, df.assign(_row_key=keys))
+    # Serve the memory-mapped copy so the freshly parsed private frame can be released
+    cached = read_cached_frame(file_path, fingerprint)
+    if cached is not None:
+        cached.pop("_row_key")
+        df = cached
+    return {"stamp": stamp, "fingerprint": fingerprint, "df": df, "keys": keys, "stats": stats}
+
+
+@st.cache_resource
+def _dataset_state():
+    """Process-wide holder of the loaded frame, shared read-only by all sessions."""
+    return {"lock": threading.Lock(), "stamps": None, "partitions": {},
+            "df": None, "keys": None, "part_ids": None, "stats": None}
+
+
+def _previous(state, path):
+    """The rows `path` contributed to the current frame, as `(df, keys)`."""
+    meta = state["partitions"].get(path)
+    if meta is None:
+        return None
+    if state["part_ids"] is None:
+        df, keys = state["df"], state["keys"]
+    else:
+        rows = state["part_ids"] == meta["part_id"]
+        df, keys = state["df"][rows].reset_index(drop=True), state["keys"][rows]
+    df = df.copy(deep=False)
+    df.attrs = {"data_version": meta["fingerprint"]["digest"]}
+    return df, keys
+
+
+def _partition_meta(part):
+    """Bookkeeping kept per partition: identity, statistics and dropped rows."""
+    return {"stamp": part["stamp"], "fingerprint": part["fingerprint"], "stats": part["stats"],
+            "invalid_rows": part["df"].attrs.get("invalid_rows", {})}
+
+
+def _refresh(state, paths, stamps):
+    """Reload the partitions whose files changed and rebuild the shared frame."""
+    old = state["partitions"]
+    changed = [path for path in paths if path not in old or old[path]["stamp"] != stamps[path]]
+
+    loaded = {}
+    if len(changed) > 1 and MAX_WORKERS > 1:
+        # Whole partitions parse independently: fan them out to worker processes
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(len(changed), MAX_WORKERS), mp_context=context) as pool:
+            loaded = dict(zip(changed, pool.map(load_partition, changed)))
+    else:
+        for path in changed:
+            previous_stats = old[path]["stats"] if path in old else None
+            loaded[path] = load_partition(path, _previous(state, path), previous_stats)
+
+    parts = []
+    for path in paths:
+        if path in loaded:
+            parts.append(loaded[path])
+        else:
+            df, keys = _previous(state, path)
+            parts.append({**old[path], "df": df, "keys": keys})
+
+    part_ids = None
+    if len(parts) == 1:
+        df, keys = parts[0]["df"], parts[0]["keys"]
+    else:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part["fingerprint"]["digest"].encode("ascii"))
+        data_version = digest.hexdigest()
+        # The combined frame is globally sorted by date; only the date columns and keys are needed for the order
+        keys = np.concatenate([part["keys"] for part in parts])
+        order = _date_order(np.concatenate([part["df"]["種植日期"].to_numpy() for part in parts]),
+                            np.concatenate([part["df"]["採收日期"].to_numpy() for part in parts]), keys)
+        part_ids = np.repeat(np.arange(len(parts), dtype=np.int32), [len(part["df"]) for part in parts])[order]
+        keys = keys[order]
+        # Another app process may already have published this exact combination
+        df = open_shared_frame(data_version)
+        if df is None:
+            # Shallow copies: _assemble pops columns, the partition frames stay intact
+            combined = _assemble([part["df"].copy(deep=False) for part in parts])
+            df = share_frame(combined.take(order).reset_index(drop=True), data_version)
+        df.attrs = {"data_version": data_version}
+
+    partitions = {}
+    for part_id, (path, part) in enumerate(zip(paths, parts)):
+        meta = _partition_meta(part) if path in loaded else old[path]
+        partitions[path] = {**meta, "part_id": part_id}
+
+    invalid = {reason: 0 for reason in schema.INVALID_REASONS}
+    for meta in partitions.values():
+        for reason, count in meta["invalid_rows"].items():
+            invalid[reason] += count
+    df.attrs["invalid_rows"] = invalid
+    # Partition statistics merge by addition: only changed partitions were recomputed
+    stats = merge_stats(*(meta["stats"] for meta in partitions.values())) if len(parts) > 1 else parts[0]["stats"]
+    state.update(stamps=stamps, partitions=partitions, df=df, keys=keys, part_ids=part_ids, stats=stats)
+
+
+def dataset_stats(df):
+    """Loader-maintained statistics for `df` if it is the current shared frame, else None."""
+    state = _dataset_state()
+    return state["stats"] if state["df"] is df else None
+
+
+def load_data():
+    """Return the shared product frame, refreshed when the source changes.
+
+    DATA_PATH may be a single export file or a directory of partition files
+    (e.g. one per month or greenhouse); partitions are loaded in parallel and
+    combined into one frame sorted by planting date. Every call (i.e. every Streamlit rerun) costs
+    a `stat()` per file; when files were updated, only those are reloaded, and
+    within a single changed file only new or changed records are parsed, so
+    open sessions pick up new data on their next rerun. The returned frame is
+    shared across sessions and must not be modified in place.
+    """
+    state = _dataset_state()
+    try:
+        if not os.path.exists(DATA_PATH):
+            st.error(f"❌ 找不到檔案: {DATA_PATH}")
             return None
 
-        df = pd.DataFrame(valid_records)
-        df["種植日期"] = pd.to_datetime(df["種植日期"])
-        df["採收日期"] = pd.to_datetime(df["採收日期"])
-        df["種植時間（日）"] = (df["採收日期"] - df["種植日期"]).dt.days
+        paths = discover_partitions(DATA_PATH) if os.path.isdir(DATA_PATH) else [DATA_PATH]
+        if not paths:
+            st.error(f"❌ 資料夾內沒有資料檔: {DATA_PATH}")
+            return None
 
-        return df
+        stamps = {path: _stamp(path) for path in paths}
+        with state["lock"]:
+            if state["stamps"] != stamps:
+                try:
+                    _refresh(state, paths, stamps)
+                except Exception as e:
+                    if state["df"] is None:
+                        raise
+                    # e.g. the export is still being written; retry on the next rerun
+                    st.warning(f"⚠️ 資料更新失敗，暫時沿用上一版資料: {str(e)}")
+            return state["df"]
 
+    except ValueError as e:
+        st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"❌ 載入資料時發生錯誤: {str(e)}")
         return None
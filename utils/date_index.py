@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+class DateIndex:
+    """Binary-search date lookups over a frame sorted by 種植日期 (as load_data returns it).
+
+    Planting-date ranges are zero-copy row slices. Harvest dates get a
+    precomputed ordering so harvest-date ranges are O(log n) as well.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.planting = df["種植日期"].to_numpy()
+        harvest = df["採收日期"].to_numpy()
+        self.harvest_order = np.argsort(harvest, kind="stable")
+        self.harvest_sorted = harvest[self.harvest_order]
+        self.sorted = bool((self.planting[1:] >= self.planting[:-1]).all())
+        days = df["種植時間（日）"].to_numpy()
+        # Exact, unlike the whole days in 種植時間（日）, which drop the time of day
+        self.longest = pd.Timedelta((harvest - self.planting).max())
+        self.bounds = {
+            "planting_min": pd.Timestamp(self.planting.min()),
+            "planting_max": pd.Timestamp(self.planting.max()),
+            "harvest_min": pd.Timestamp(self.harvest_sorted[0]),
+            "harvest_max": pd.Timestamp(self.harvest_sorted[-1]),
+            "days_min": int(days.min()),
+            "days_max": int(days.max()),
+        }
+
+    def planted_between(self, start, end) -> pd.DataFrame:
+        """Rows planted within [start, end], as a zero-copy slice."""
+        if not self.sorted:
+            return self.df[(self.df["種植日期"] >= start) & (self.df["種植日期"] <= end)]
+        lo = np.searchsorted(self.planting, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = np.searchsorted(self.planting, np.datetime64(pd.Timestamp(end)), side="right")
+        return self.df.iloc[lo:hi]
+
+    def harvested_between(self, start, end) -> pd.DataFrame:
+        """Rows harvested within [start, end], in frame order."""
+        lo = np.searchsorted(self.harvest_sorted, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = np.searchsorted(self.harvest_sorted, np.datetime64(pd.Timestamp(end)), side="right")
+        return self.df.take(np.sort(self.harvest_order[lo:hi]))
+
+    def select(self, start, end) -> pd.DataFrame:
+        """Rows planted on/after `start` and harvested on/before `end`.
+
+        Rows planted more than the longest growing time before `end` are all
+        harvested by `end`, so only the tail of the planting slice is checked.
+        The result is a zero-copy slice whenever that tail fully qualifies.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if self.bounds["days_min"] < 0 or not self.sorted:
+            # Unsorted frame or harvest before planting: the slice argument doesn't hold, scan instead
+            return self.df[(self.df["種植日期"] >= start) & (self.df["採收日期"] <= end)]
+        rows = self.planted_between(start, end)
+        cutoff = end - self.longest
+        head = np.searchsorted(rows["種植日期"].to_numpy(), np.datetime64(cutoff), side="left")
+        tail_ok = rows["採收日期"].to_numpy()[head:] <= np.datetime64(end)
+        if tail_ok.all():
+            return rows
+        return rows[np.concatenate([np.ones(head, dtype=bool), tail_ok])]
+
+
+@st.cache_resource(max_entries=2)
+def _cached_index(data_version, _df):
+    return DateIndex(_df)
+
+
+def get_date_index(df: pd.DataFrame) -> DateIndex:
+    """The date index for `df`, built once per data version and shared by all sessions."""
+    return _cached_index(df.attrs.get("data_version"), df)
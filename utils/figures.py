@@ -0,0 +1,93 @@
+import matplotlib.pyplot as plt
+import seaborn as sns
+import pandas as pd
+
+# Chinese font settings; set at import so report worker processes get them too
+plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
+plt.rcParams['axes.unicode_minus'] = False
+
+
+def _present_order(series):
+    """Categories present in `series`; None keeps seaborn's default order."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.remove_unused_categories().cat.categories
+    return None
+
+
+def bar_figure(values: pd.Series, title, y_label):
+    """One bar per product."""
+    fig = plt.figure(figsize=(10, 5))
+    sns.barplot(x=values.index, y=values.values, order=values.index)
+    plt.title(title)
+    plt.xlabel("產品名稱")
+    plt.ylabel(y_label)
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+def pie_figure(status_counts: pd.Series):
+    fig, ax = plt.subplots()
+    ax.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%')
+    ax.set_title("🔄 不同狀態的產品分布")
+    return fig
+
+
+def box_figure(boxes):
+    """Box plot from precomputed `bxp` statistics."""
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bxp(boxes, showfliers=False, showmeans=True)
+    ax.set_title("📦 各產品種植時間分佈")
+    ax.set_xlabel("產品名稱")
+    ax.set_ylabel("種植時間（日）")
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+def trend_figure(series, period):
+    """Lines for `[(label, series), ...]` of counts per period."""
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for label, values in series:
+        ax.plot(values.index, values.values, label=label, linewidth=1)
+    ax.set_title(f"📈 每{period}種植與採收數量")
+    ax.set_xlabel("日期")
+    ax.set_ylabel("數量")
+    ax.legend()
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    return fig
+
+
+def status_mix_figure(shares: pd.DataFrame):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.stackplot(shares.index, shares.T.values * 100, labels=shares.columns, step="post")
+    ax.set_title("🔄 各種植月份的狀態比例")
+    ax.set_xlabel("種植月份")
+    ax.set_ylabel("比例（%）")
+    ax.set_ylim(0, 100)
+    ax.legend(loc="upper left")
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    return fig
+
+
+def custom_figure(filtered_df: pd.DataFrame, x_col, y_col):
+    """Mean of `y_col` per value of `x_col`."""
+    fig = plt.figure(figsize=(10, 5))
+    sns.barplot(data=filtered_df, x=x_col, y=y_col, estimator='mean', errorbar=None,
+                order=_present_order(filtered_df[x_col]))
+    plt.title(f"📊 {x_col} vs {y_col}")
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+FIGURES = {
+    "bar": bar_figure,
+    "pie": pie_figure,
+    "box": box_figure,
+    "trend": trend_figure,
+    "status_mix": status_mix_figure,
+    "custom": custom_figure,
+}
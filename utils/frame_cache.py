@@ -0,0 +1,150 @@
+import os
+import glob
+import json
+import hashlib
+
+# Cleaned frames are cached next to the data, one Feather file per source.
+# Files are written uncompressed so they can be memory-mapped: every session
+# and every app process on the host then reads the same page-cache pages.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Data/.cache")
+# Bump when the cached frame layout changes so old files are ignored
+CACHE_VERSION = 5
+
+try:
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def _cache_paths(source_path):
+    source_path = os.path.abspath(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    tag = hashlib.sha1(source_path.encode("utf-8")).hexdigest()[:10]
+    base = os.path.join(CACHE_DIR, f"{stem}-{tag}")
+    return base + ".feather", base + ".meta.json"
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, meta_path)
+
+
+def _read_mapped(frame_path):
+    """Memory-map a Feather file; numeric and date columns stay zero-copy views of it."""
+    return feather.read_table(frame_path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _write_frame(frame_path, df):
+    # Write under a per-process name first: replicas may publish concurrently,
+    # and readers that already mapped the old file keep their pages
+    tmp_path = f"{frame_path}.{os.getpid()}.tmp"
+    df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, frame_path)
+
+
+def _hash_file(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source_path):
+    """Return {size, mtime_ns, digest} for a source file.
+
+    The content hash is only recomputed when size or mtime differ from the
+    cached metadata, so warm starts cost a single `stat()`.
+    """
+    stat = os.stat(source_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    meta = _read_meta(_cache_paths(source_path)[1])
+    if meta and all(meta.get(key) == value for key, value in fingerprint.items()):
+        fingerprint["digest"] = meta["digest"]
+    else:
+        fingerprint["digest"] = _hash_file(source_path)
+    return fingerprint
+
+
+def read_cached_frame(source_path, fingerprint):
+    """Load the cached frame for `source_path`, or None if missing or stale."""
+    if not HAS_PYARROW:
+        return None
+    frame_path, meta_path = _cache_paths(source_path)
+    meta = _read_meta(meta_path)
+    if not meta or meta.get("version") != CACHE_VERSION or meta.get("digest") != fingerprint["digest"]:
+        return None
+    try:
+        df = _read_mapped(frame_path)
+    except Exception:
+        return None
+    # Feather drops DataFrame.attrs; they travel in the metadata instead
+    df.attrs.update(meta.get("attrs", {}))
+    if meta["size"] != fingerprint["size"] or meta["mtime_ns"] != fingerprint["mtime_ns"]:
+        # Same content under a new mtime (e.g. re-copied file): refresh the key only
+        _write_meta(meta_path, {**meta, **fingerprint})
+    return df
+
+
+def write_cached_frame(source_path, fingerprint, df):
+    """Persist a cleaned frame; failures only cost the next cold start."""
+    if not HAS_PYARROW:
+        return
+    frame_path, meta_path = _cache_paths(source_path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_frame(frame_path, df)
+        _write_meta(meta_path, {"version": CACHE_VERSION, **fingerprint, "attrs": df.attrs})
+    except Exception:
+        pass
+
+
+def _shared_path(data_version):
+    return os.path.join(CACHE_DIR, f"shared-{data_version}-v{CACHE_VERSION}.feather")
+
+
+def open_shared_frame(data_version):
+    """Map the combined frame another process already published, if any."""
+    if not HAS_PYARROW:
+        return None
+    try:
+        return _read_mapped(_shared_path(data_version))
+    except Exception:
+        return None
+
+
+def share_frame(df, data_version):
+    """Publish a combined frame as a mapped file and return the mapped copy.
+
+    Falls back to returning `df` itself when the file cannot be written.
+    """
+    if not HAS_PYARROW:
+        return df
+    frame_path = _shared_path(data_version)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        if not os.path.exists(frame_path):
+            _write_frame(frame_path, df)
+        shared = _read_mapped(frame_path)
+    except Exception:
+        return df
+    # Older versions can go: processes still mapping them keep their pages
+    for old_path in glob.glob(os.path.join(CACHE_DIR, "shared-*.feather")):
+        if old_path != frame_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    shared.attrs.update(df.attrs)
+    return shared
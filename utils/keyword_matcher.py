@@ -0,0 +1,133 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.vocabulary import product_list, question_list
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a fixed keyword set.
+
+    `find` scans a question once and returns the leftmost-longest,
+    non-overlapping keywords, so "綠火焰" never also yields "火焰" and
+    "英貝比萵(不分品種)" wins over "英貝比萵" regardless of list order.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({str(keyword) for keyword in keywords if keyword})
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].append(keyword)
+
+        # Breadth-first so every state's failure target is final before its children
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find_all(self, text):
+        """Every (start, keyword) occurrence in `text`, overlaps included."""
+        hits = []
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for keyword in self.out[state]:
+                hits.append((pos - len(keyword) + 1, keyword))
+        return hits
+
+    def find(self, text):
+        """Leftmost-longest non-overlapping keywords, in text order."""
+        found = []
+        end = 0
+        for start, keyword in sorted(self.find_all(text), key=lambda hit: (hit[0], -len(hit[1]))):
+            if start >= end:
+                found.append(keyword)
+                end = start + len(keyword)
+        return found
+
+
+QUESTION_MATCHER = KeywordMatcher(question_list)
+
+
+class ProductPostings:
+    """Per-product row-index posting lists over 產品名稱.
+
+    Built with one stable argsort of the category codes, so each product's
+    rows are a sorted index array and filtering is a `take` instead of a
+    `str.contains` scan. The matcher covers the vocabulary plus every
+    product name present in the data.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        names = df["產品名稱"]
+        if not isinstance(names.dtype, pd.CategoricalDtype):
+            names = names.astype("category")
+        codes = names.cat.codes.to_numpy()
+        self.categories = [str(name) for name in names.cat.categories]
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories))
+        # Missing names (code -1) sort first and belong to no posting list
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+        self.postings = {name: order[offsets[i]:offsets[i + 1]] for i, name in enumerate(self.categories)}
+        self.matcher = KeywordMatcher(list(product_list) + self.categories)
+        self._expanded = {}
+
+    def match(self, question):
+        """Product keywords mentioned in `question`, in question order."""
+        return self.matcher.find(question)
+
+    def names_for(self, keyword):
+        """Product names a keyword selects: itself if present, else every name containing it."""
+        if keyword not in self._expanded:
+            if keyword in self.postings:
+                self._expanded[keyword] = [keyword]
+            else:
+                self._expanded[keyword] = [name for name in self.categories if keyword in name]
+        return self._expanded[keyword]
+
+    def rows(self, keywords):
+        """Sorted row positions for one keyword or a list of keywords."""
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        names = {name for keyword in keywords for name in self.names_for(keyword)}
+        if not names:
+            return np.empty(0, dtype=np.intp)
+        parts = [self.postings[name] for name in names]
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def take(self, keywords) -> pd.DataFrame:
+        """Rows of the frame for the given product keywords."""
+        return self.df.take(self.rows(keywords))
+
+    def count(self, keywords) -> int:
+        return len(self.rows(keywords))
+
+
+@st.cache_resource(max_entries=2)
+def _cached_postings(data_version, _df):
+    return ProductPostings(_df)
+
+
+def get_postings(df: pd.DataFrame) -> ProductPostings:
+    """The posting lists for `df`, built once per data version and shared by all sessions."""
+    return _cached_postings(df.attrs.get("data_version"), df)
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import queue
+import random
+import http.client
+from abc import ABC, abstractmethod
+from itertools import chain
+from urllib.parse import urlsplit
+import streamlit as st
+
+# Backends tried in order; later ones are fallbacks when earlier ones fail before answering
+LLM_BACKENDS = [name.strip() for name in os.getenv("CESTLAVIE_LLM_BACKENDS", "openai").split(",") if name.strip()]
+OPENAI_MODEL = os.getenv("CESTLAVIE_OPENAI_MODEL", "gpt-4o-mini")
+# Same variable docker-compose sets for the app container
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("CESTLAVIE_OLLAMA_MODEL", "mistral")
+CONNECT_TIMEOUT = 5.0
+# Longest silence while waiting for the next streamed chunk
+READ_TIMEOUT = float(os.getenv("CESTLAVIE_LLM_TIMEOUT", "60"))
+# Retries per backend, only before the first token arrives
+LLM_RETRIES = int(os.getenv("CESTLAVIE_LLM_RETRIES", "2"))
+BACKOFF_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 8.0
+# Keep-alive connections kept per host
+POOL_SIZE = 8
+
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A model call failed."""
+
+
+class RetryableError(LLMError):
+    """A failure worth retrying: connection errors, timeouts, rate limits, 5xx."""
+
+
+class Reply:
+    """A streamed answer: iterate for text deltas; afterwards `text`, the token usage
+    (when the backend reports it) and the serving `backend` are set."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.parts = []
+        self.input_tokens = None
+        self.output_tokens = None
+        self._chunks = iter(())
+
+    def __iter__(self):
+        for delta in self._chunks:
+            self.parts.append(delta)
+            yield delta
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one host, shared by threads.
+
+    A connection goes back to the pool only after its response was read to
+    the end; one that failed is closed instead.
+    """
+
+    def __init__(self, base_url, size=POOL_SIZE, timeout=READ_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = factory(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            conn.connect()
+            conn.sock.settimeout(self.timeout)
+            return conn
+
+    def release(self, conn):
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+class Backend(ABC):
+    """One provider and model. `open()` starts a call and returns an iterator of text deltas."""
+
+    name = "backend"
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    @abstractmethod
+    def open(self, messages, temperature, reply):
+        """Start a call; failures before the first delta raise `RetryableError` or `LLMError`."""
+
+
+class OllamaBackend(Backend):
+    """Ollama's /api/chat, streamed as newline-delimited JSON over pooled connections."""
+
+    name = "ollama"
+
+    def __init__(self, model=OLLAMA_MODEL, host=OLLAMA_HOST, timeout=READ_TIMEOUT):
+        super().__init__(model)
+        self.pool = ConnectionPool(host, timeout=timeout)
+
+    def open(self, messages, temperature, reply):
+        body = json.dumps({"model": self.model, "messages": messages, "stream": True,
+                           "options": {"temperature": temperature}}).encode("utf-8")
+        try:
+            conn = self.pool.acquire()
+        except OSError as e:
+            raise RetryableError(f"{self.identity}: {e}") from e
+        try:
+            conn.request("POST", "/api/chat", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            # A pooled connection the server already closed fails on first use
+            raise RetryableError(f"{self.identity}: {e}") from e
+        if response.status != 200:
+            detail = response.read().decode("utf-8", "replace")[:200]
+            conn.close()
+            error = RetryableError if response.status in _RETRY_STATUSES else LLMError
+            raise error(f"{self.identity}: HTTP {response.status} {detail}")
+        return self._read(conn, response, reply)
+
+    def _read(self, conn, response, reply):
+        done = False
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError as e:
+                    raise LLMError(f"{self.identity}: malformed stream line {line[:80]!r}") from e
+                if "error" in chunk:
+                    raise LLMError(f"{self.identity}: {chunk['error']}")
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    reply.input_tokens = chunk.get("prompt_eval_count")
+                    reply.output_tokens = chunk.get("eval_count")
+                    done = True
+        except (OSError, http.client.HTTPException) as e:
+            raise RetryableError(f"{self.identity}: {e}") from e
+        finally:
+            if done and not response.will_close:
+                self.pool.release(conn)
+            else:
+                conn.close()
+
+
+class OpenAIBackend(Backend):
+    """OpenAI Responses API through the official client, which pools its own connections."""
+
+    name = "openai"
+
+    def __init__(self, api_key, model=OPENAI_MODEL, timeout=READ_TIMEOUT):
+        super().__init__(model)
+        # Imported here so sessions that never call OpenAI don't load the package
+        import openai
+        self.errors = openai
+        # Retries are ours (with jitter and fallback), not the client's
+        self.client = openai.OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+
+    def open(self, messages, temperature, reply):
+        errors = self.errors
+        try:
+            manager = self.client.responses.stream(model=self.model, input=messages, temperature=temperature)
+            stream = manager.__enter__()
+        except errors.OpenAIError as e:
+            raise self._error(e) from e
+        return self._read(manager, stream, reply)
+
+    def _error(self, e):
+        """Our error for a client error; statuses without their own class (e.g. 408) are retried too."""
+        errors = self.errors
+        retryable = (isinstance(e, (errors.APIConnectionError, errors.RateLimitError, errors.InternalServerError))
+                     or getattr(e, "status_code", None) in _RETRY_STATUSES)
+        return (RetryableError if retryable else LLMError)(f"{self.identity}: {e}")
+
+    def _read(self, manager, stream, reply):
+        errors = self.errors
+        try:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+            usage = stream.get_final_response().usage
+            if usage is not None:
+                reply.input_tokens, reply.output_tokens = usage.input_tokens, usage.output_tokens
+        except errors.OpenAIError as e:
+            raise self._error(e) from e
+        finally:
+            manager.__exit__(None, None, None)
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_SECONDS * 2 ** attempt))
+
+
+class LLMRouter:
+    """Backends in fallback order, each with bounded retries.
+
+    A call is retried or handed to the next backend only until its first
+    token arrives; after that, output has been shown and errors propagate.
+    """
+
+    def __init__(self, backends, retries=LLM_RETRIES):
+        self.backends = list(backends)
+        self.retries = retries
+
+    @property
+    def identity(self) -> str:
+        """The primary backend; answers cached under it must come from it."""
+        return self.backends[0].identity
+
+    def stream(self, messages, temperature=0.2) -> Reply:
+        error = None
+        for backend in self.backends:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(backoff(attempt - 1))
+                reply = Reply(backend)
+                try:
+                    chunks = backend.open(messages, temperature, reply)
+                    first = next(chunks, None)
+                except RetryableError as e:
+                    error = e
+                    continue
+                except LLMError as e:
+                    error = e
+                    break
+                reply._chunks = chunks if first is None else chain([first], chunks)
+                return reply
+        raise error or LLMError("沒有可用的模型後端")
+
+    def complete(self, messages, temperature=0.2) -> str:
+        """Whole answer text; for batch and evaluation scripts."""
+        reply = self.stream(messages, temperature)
+        for _ in reply:
+            pass
+        return reply.text
+
+
+def build_router(names=None, api_key=None, openai_model=OPENAI_MODEL, ollama_model=OLLAMA_MODEL):
+    """Router over the named backends (default CESTLAVIE_LLM_BACKENDS); None if none is usable.
+
+    OpenAI is skipped without an API key, so "openai,ollama" degrades to Ollama.
+    """
+    backends = []
+    for name in names or LLM_BACKENDS:
+        if name == "openai":
+            api_key = api_key or os.getenv("OPENAI_API_KEY")
+            if api_key:
+                backends.append(OpenAIBackend(api_key, openai_model))
+        elif name == "ollama":
+            backends.append(OllamaBackend(ollama_model))
+        else:
+            raise ValueError(f"Unknown LLM backend: {name}")
+    return LLMRouter(backends) if backends else None
+
+
+@st.cache_resource
+def get_llm(api_key=None):
+    """The process-wide router, so every session shares the pooled connections."""
+    return build_router(api_key=api_key)
@@ -0,0 +1,112 @@
+"""Local stand-in for an Ollama server, for offline and load testing.
+
+Speaks the streaming /api/chat protocol (newline-delimited JSON over chunked
+HTTP/1.1 with keep-alive) with configurable latency, so the app and the
+evaluation scripts can run against it via OLLAMA_HOST:
+
+    python -m utils.llm_stub --port 11435 --first-token 0.4 --token-delay 0.03
+    CESTLAVIE_LLM_BACKENDS=ollama OLLAMA_HOST=http://localhost:11435 streamlit run main.py
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "這是測試伺服器的模擬回答，內容不代表實際資料。"
+
+
+class StubConfig:
+    def __init__(self, first_token=0.3, token_delay=0.02, tokens=40, failure_rate=0.0):
+        self.first_token = first_token
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def _handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, payload):
+            data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": "stub"}]})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with config.lock:
+                config.requests += 1
+            if self.path != "/api/chat":
+                self._send_json(404, {"error": "not found"})
+                return
+            if random.random() < config.failure_rate:
+                self._send_json(503, {"error": "stub: simulated overload"})
+                return
+            model = request.get("model", "stub")
+            prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(config.first_token)
+            for i in range(config.tokens):
+                if i:
+                    time.sleep(config.token_delay)
+                self._chunk({"model": model, "message": {"role": "assistant", "content": REPLY[i % len(REPLY)]},
+                             "done": False})
+            # Ollama reports token counts on the final line; the prompt count is a rough character estimate
+            self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                         "prompt_eval_count": len(prompt), "eval_count": config.tokens})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(port=11435, host="127.0.0.1", **options):
+    """Start the stub in a background thread; returns the server (call `shutdown()` to stop)."""
+    config = StubConfig(**options)
+    server = ThreadingHTTPServer((host, port), _handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per answer")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+    server = serve(args.port, args.host, first_token=args.first_token, token_delay=args.token_delay,
+                   tokens=args.tokens, failure_rate=args.failure_rate)
+    print(f"Ollama stub listening on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,66 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+
+def _is_mapped(series):
+    """True when the column's values are a zero-copy view of a mapped Arrow buffer."""
+    values = series.cat.codes if isinstance(series.dtype, pd.CategoricalDtype) else series
+    array = values.to_numpy()
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return array is not None and type(array).__name__ == "PyCapsule"
+
+
+def frame_memory(df):
+    """Bytes held by `df`, split into memory-mapped (shared) and private."""
+    usage = df.memory_usage(deep=True, index=False)
+    mapped = sum(int(usage[col]) for col in df.columns if _is_mapped(df[col]))
+    total = int(usage.sum())
+    return {"total": total, "mapped": mapped, "private": total - mapped}
+
+
+def process_memory():
+    """Resident and file-backed shared bytes of this process, or None off Linux."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            _, resident, shared = (int(value) for value in file.read().split()[:3])
+    except (OSError, ValueError):
+        return None
+    page = os.sysconf("SC_PAGE_SIZE")
+    return {"rss": resident * page, "shared": shared * page}
+
+
+def peak_memory():
+    """Highest resident bytes this process has reached, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _deep_size(value, seen):
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    return size
+
+
+def session_memory(session_state):
+    """Approximate bytes one session keeps in `st.session_state`."""
+    seen = set()
+    return sum(_deep_size(value, seen) for value in session_state.to_dict().values())
@@ -0,0 +1,72 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+import matplotlib.pyplot as plt
+import streamlit as st
+
+# Byte budget for rendered chart images, shared by all sessions of the process
+CHART_CACHE_BYTES = int(float(os.getenv("CESTLAVIE_CHART_CACHE_MB", "64")) * (1 << 20))
+RENDER_DPI = 150
+
+
+class RenderCache:
+    """Least-recently-used cache of rendered images, bounded by total bytes."""
+
+    def __init__(self, max_bytes=CHART_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def render_figure(fig, fmt="png") -> bytes:
+    """Render a figure to image bytes and release it, even if rendering fails."""
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, bbox_inches="tight", dpi=RENDER_DPI)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+@st.cache_resource
+def get_render_cache() -> RenderCache:
+    """The process-wide chart image cache."""
+    return RenderCache()
+
+
+def cached_render(key, draw, fmt="png") -> bytes:
+    """Image bytes for `key`; `draw()` builds the figure only on a cache miss."""
+    cache = get_render_cache()
+    key = (*key, fmt)
+    data = cache.get(key)
+    if data is None:
+        data = render_figure(draw(), fmt)
+        cache.put(key, data)
+    return data
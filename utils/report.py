@@ -0,0 +1,56 @@
+import io
+import os
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.render_cache import RENDER_DPI, get_render_cache, render_figure
+
+# Defined here rather than imported from the loader: spawned workers import this module
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def _render_job(job):
+    """Draw and encode one chart; runs in worker processes, so it must not call Streamlit."""
+    from utils.figures import FIGURES
+    name, args = job
+    return render_figure(FIGURES[name](*args))
+
+
+def render_charts(charts):
+    """PNG bytes for `[(key, filename, figure_name, args), ...]`, in order.
+
+    Charts already in the render cache (e.g. the one on screen) are reused;
+    the rest are drawn in parallel worker processes and cached.
+    """
+    cache = get_render_cache()
+    images = [cache.get((*key, "png")) for key, _, _, _ in charts]
+    missing = [i for i, image in enumerate(images) if image is None]
+    jobs = [(charts[i][2], charts[i][3]) for i in missing]
+    if len(jobs) > 1 and MAX_WORKERS > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(len(jobs), MAX_WORKERS), mp_context=context) as pool:
+            rendered = list(pool.map(_render_job, jobs))
+    else:
+        rendered = [_render_job(job) for job in jobs]
+    for i, image in zip(missing, rendered):
+        images[i] = image
+        cache.put((*charts[i][0], "png"), image)
+    return [(filename, image) for (_, filename, _, _), image in zip(charts, images)]
+
+
+def build_zip(images) -> bytes:
+    """ZIP archive of `[(filename, png_bytes), ...]`; PNGs are stored, not recompressed."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as archive:
+        for filename, image in images:
+            archive.writestr(filename, image)
+    return buf.getvalue()
+
+
+def build_pdf(images) -> bytes:
+    """Multi-page PDF with one chart per page."""
+    pages = [Image.open(io.BytesIO(image)).convert("RGB") for _, image in images]
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], resolution=RENDER_DPI)
+    return buf.getvalue()
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from utils.llm_backends import get_llm
+
+# Provider limits the whole process must stay under (all sessions together)
+REQUESTS_PER_MINUTE = int(os.getenv("CESTLAVIE_LLM_RPM", "60"))
+TOKENS_PER_MINUTE = int(os.getenv("CESTLAVIE_LLM_TPM", "200000"))
+# Questions waiting beyond this are turned away instead of queueing for minutes
+MAX_QUEUE = int(os.getenv("CESTLAVIE_LLM_QUEUE", "32"))
+MAX_CONCURRENT = int(os.getenv("CESTLAVIE_LLM_CONCURRENCY", "4"))
+# Output tokens reserved per call until the real count is known
+OUTPUT_TOKENS_ESTIMATE = 400
+# Prompts up to this many tokens go ahead of longer ones…
+SHORT_TOKENS = 800
+# …unless the longer one has waited this long
+AGING_SECONDS = 10.0
+
+
+class QueueFull(Exception):
+    """The model queue is at MAX_QUEUE."""
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, bursting up to `capacity`. Not locked: callers hold the scheduler lock."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount) -> float:
+        """Seconds until `amount` can be taken (0 if now); larger amounts wait for a full bucket."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Correct an earlier estimate; a positive `amount` may leave the bucket in debt."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class SharedCall:
+    """One model call, streamed to every session that asked the same question.
+
+    Deltas are kept so a session that joins late still gets the whole answer.
+    """
+
+    def __init__(self, key, messages, temperature, tokens, seq):
+        self.key = key
+        self.messages = messages
+        self.temperature = temperature
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.started = None
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.reply = None
+        self.sessions = 1
+        self.cond = threading.Condition()
+
+    @property
+    def queue_seconds(self) -> float:
+        return (self.started or time.monotonic()) - self.enqueued
+
+    def _publish(self, delta):
+        with self.cond:
+            self.parts.append(delta)
+            self.cond.notify_all()
+
+    def _finish(self, reply=None, error=None):
+        with self.cond:
+            self.reply, self.error, self.done = reply, error, True
+            self.cond.notify_all()
+
+    def wait_started(self, scheduler, on_wait, interval=0.25):
+        """Block until the call is dispatched, calling `on_wait(position)` while it is queued."""
+        while True:
+            with self.cond:
+                if self.started is not None or self.done:
+                    return
+                self.cond.wait(interval)
+                if self.started is not None or self.done:
+                    return
+            on_wait(scheduler.position(self))
+
+    def stream(self):
+        """Yield the answer's deltas as they arrive; raises the call's error if it failed."""
+        cursor = 0
+        while True:
+            with self.cond:
+                while cursor == len(self.parts) and not self.done:
+                    self.cond.wait()
+                new = self.parts[cursor:]
+                finished = self.done
+            yield from new
+            cursor += len(new)
+            if finished and cursor == len(self.parts):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+def call_key(messages, temperature) -> str:
+    """Identity of a model request: every message sent, not just the question."""
+    payload = json.dumps([float(temperature), [[m["role"], m["content"]] for m in messages]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Scheduler:
+    """Process-wide admission control for model calls.
+
+    Calls wait in a bounded queue and are dispatched to MAX_CONCURRENT worker
+    threads while the request and token buckets allow. Short prompts go
+    first; long ones are promoted after AGING_SECONDS so they can't starve.
+    Identical requests (same messages and temperature, so the same question
+    in the same conversation context) share one call while it is queued or
+    running. Cached and data answers never reach the scheduler.
+    """
+
+    def __init__(self, llm, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, max_queue=MAX_QUEUE,
+                 max_concurrent=MAX_CONCURRENT):
+        self.llm = llm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_queue = max_queue
+        self.max_concurrent = max_concurrent
+        self.queue = []
+        self.calls = {}
+        self.running = 0
+        self.counters = {"submitted": 0, "coalesced": 0, "rejected": 0}
+        self.seq = count()
+        self.lock = threading.Condition()
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm")
+        threading.Thread(target=self._dispatch, daemon=True, name="llm-dispatch").start()
+
+    def submit(self, messages, temperature, input_tokens):
+        """`(call, joined)`; `joined` is True when an identical call was already in flight."""
+        key = call_key(messages, temperature)
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.sessions += 1
+                self.counters["coalesced"] += 1
+                return call, True
+            if len(self.queue) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise QueueFull()
+            call = SharedCall(key, messages, temperature, input_tokens + OUTPUT_TOKENS_ESTIMATE, next(self.seq))
+            self.queue.append(call)
+            self.calls[key] = call
+            self.counters["submitted"] += 1
+            self.lock.notify_all()
+            return call, False
+
+    def _priority(self, call, now):
+        urgent = call.tokens <= SHORT_TOKENS + OUTPUT_TOKENS_ESTIMATE or now - call.enqueued >= AGING_SECONDS
+        return (0 if urgent else 1, call.seq)
+
+    def position(self, call) -> int:
+        """1-based place of a queued call in dispatch order; 0 once it is running."""
+        with self.lock:
+            if call not in self.queue:
+                return 0
+            now = time.monotonic()
+            mine = self._priority(call, now)
+            return 1 + sum(self._priority(other, now) < mine for other in self.queue)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(self.counters, queued=len(self.queue), running=self.running)
+
+    def _dispatch(self):
+        while True:
+            with self.lock:
+                while not self.queue or self.running >= self.max_concurrent:
+                    self.lock.wait()
+                now = time.monotonic()
+                call = min(self.queue, key=lambda c: self._priority(c, now))
+                wait = max(self.requests.delay(1), self.tokens.delay(call.tokens))
+                if wait > 0:
+                    # Woken early by a new submission, which may be a shorter call
+                    self.lock.wait(wait)
+                    continue
+                self.requests.take(1)
+                self.tokens.take(call.tokens)
+                self.queue.remove(call)
+                self.running += 1
+            with call.cond:
+                call.started = time.monotonic()
+                call.cond.notify_all()
+            self.pool.submit(self._run, call)
+
+    def _run(self, call):
+        try:
+            reply = self.llm.stream(call.messages, call.temperature)
+            for delta in reply:
+                call._publish(delta)
+        except Exception as e:
+            call._finish(error=e)
+        else:
+            call._finish(reply=reply)
+        finally:
+            with self.lock:
+                if call.reply is not None and call.reply.input_tokens is not None:
+                    used = call.reply.input_tokens + (call.reply.output_tokens or 0)
+                    self.tokens.adjust(used - call.tokens)
+                self.running -= 1
+                if self.calls.get(call.key) is call:
+                    del self.calls[call.key]
+                self.lock.notify_all()
+
+
+# Set once get_scheduler has built the scheduler; read-only views use it without building one
+_current = None
+
+
+@st.cache_resource
+def get_scheduler(api_key=None):
+    """The process-wide scheduler over the shared model router; None without a usable backend.
+
+    Building it builds the backends (and imports their client libraries), so
+    callers resolve it only once a question actually needs the model.
+    """
+    global _current
+    llm = get_llm(api_key)
+    scheduler = Scheduler(llm) if llm is not None else None
+    if scheduler is not None:
+        _current = scheduler
+    return scheduler
+
+
+def current_scheduler():
+    """The scheduler if a question has already built it, else None; never builds one."""
+    return _current
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Declared Sheet1 fields and the compact dtype each one is stored as
+SCHEMA = {
+    "產品編號": "int32",
+    "產品名稱": "category",
+    "種植日期": "datetime64[ns]",
+    "採收日期": "datetime64[ns]",
+    "狀態": "category",
+}
+REQUIRED_COLUMNS = list(SCHEMA)
+DATE_COLUMNS = ["種植日期", "採收日期"]
+CATEGORY_COLUMNS = ["產品名稱", "狀態"]
+
+# Derived column: growing days always fit in a small int
+DAYS_COLUMN = "種植時間（日）"
+DAYS_DTYPE = "int16"
+
+# Exports write ISO dates ("2022-03-03" / "2022-03-03 00:00:00"); no per-row format inference
+DATE_FORMAT = "ISO8601"
+
+# Invalid-row reasons, in the order they are checked (each row counts once)
+INVALID_REASONS = {
+    "missing_value": "欄位缺漏或為空值",
+    "invalid_product_id": "產品編號不是有效整數",
+    "invalid_date": "日期格式錯誤",
+}
+
+
+def validate(raw: pd.DataFrame):
+    """Vectorized validation and typing of a raw Sheet1 frame.
+
+    Returns `(typed_df, invalid_counts)` where `invalid_counts` maps each
+    reason in INVALID_REASONS to the number of rows dropped for it.
+    """
+    invalid = {reason: 0 for reason in INVALID_REASONS}
+    bad = np.zeros(len(raw), dtype=bool)
+
+    def reject(reason, mask):
+        mask = np.asarray(mask, dtype=bool) & ~bad
+        invalid[reason] += int(mask.sum())
+        bad[mask] = True
+
+    if any(col not in raw.columns for col in REQUIRED_COLUMNS):
+        reject("missing_value", np.ones(len(raw), dtype=bool))
+        return raw.iloc[:0], invalid
+
+    required = raw[REQUIRED_COLUMNS]
+    reject("missing_value", required.isna().any(axis=1) | (required == "").any(axis=1))
+
+    product_id = pd.to_numeric(raw["產品編號"], errors="coerce")
+    out_of_range = product_id.abs() > np.iinfo(SCHEMA["產品編號"]).max
+    reject("invalid_product_id", product_id.isna() | (product_id % 1 != 0) | out_of_range)
+
+    dates = {col: pd.to_datetime(raw[col], format=DATE_FORMAT, errors="coerce") for col in DATE_COLUMNS}
+    reject("invalid_date", dates["種植日期"].isna() | dates["採收日期"].isna())
+
+    keep = ~bad
+    df = raw.loc[keep].reset_index(drop=True)
+    df["產品編號"] = product_id[keep].astype(SCHEMA["產品編號"]).to_numpy()
+    for col in DATE_COLUMNS:
+        df[col] = dates[col][keep].astype(SCHEMA[col]).to_numpy()
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype(str).astype("category")
+    return df, invalid
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Compute growing days from the typed date columns."""
+    df[DAYS_COLUMN] = (df["採收日期"] - df["種植日期"]).dt.days.astype(DAYS_DTYPE)
+    return df
+
+
+def concat_column(pieces):
+    """Concatenate one column's pieces, keeping categoricals categorical.
+
+    Categories are unioned and sorted so that frames built from different
+    chunks or files share the same category codes.
+    """
+    if pieces and all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+        return pd.Series(union_categoricals(pieces, sort_categories=True))
+    return pd.concat(pieces, ignore_index=True)
+
+
+def format_invalid_counts(invalid):
+    """Human-readable summary of dropped rows, e.g. for logs and warnings."""
+    return "，".join(f"{INVALID_REASONS[reason]} {count} 筆"
+                    for reason, count in invalid.items() if count)
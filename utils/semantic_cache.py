@@ -0,0 +1,175 @@
+import os
+import time
+import sqlite3
+import threading
+import importlib.util
+from contextlib import closing
+import numpy as np
+import streamlit as st
+from utils.answer_cache import get_answer_cache, normalize_question
+
+# Paraphrased questions ("紅火焰總數是多少" / "有幾顆紅火焰") reuse a stored answer
+# when their embeddings are close enough. The model is the small multilingual one
+# the earlier RAG prototype used (archieve/utils.py)
+EMBEDDING_MODEL = os.getenv("CESTLAVIE_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+# Cosine similarity a stored question must reach; tune it with the audit metrics
+SIMILARITY_THRESHOLD = float(os.getenv("CESTLAVIE_SEMANTIC_THRESHOLD", "0.9"))
+# Lookups kept for the metrics
+AUDIT_ROWS = 10_000
+# Nearest stored questions tried per lookup, so an expired or evicted best match
+# doesn't hide a live one just behind it
+SEARCH_CANDIDATES = 5
+# sentence-transformers (and torch) are optional: without them only exact repeats are cached
+HAS_SENTENCE_TRANSFORMERS = importlib.util.find_spec("sentence_transformers") is not None
+
+
+class SemanticIndex:
+    """Unit-length question embeddings per (scope, topic), searched by inner product.
+
+    Mirrors the embeddings stored in the answer cache and follows new entries
+    by id, so answers written by other sessions and processes become
+    searchable too. A brute-force matrix product over a few thousand 384-d
+    vectors takes well under a millisecond, so no ANN library is needed.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.last_id = 0
+        self.groups = {}  # (scope, topic) -> (keys, matrix)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _sync(self):
+        rows = self.cache.embeddings_since(self.last_id)
+        if not rows:
+            return
+        if self.size + len(rows) > 2 * self.cache.max_entries:
+            # Evicted entries pile up otherwise: rebuild from the live ones
+            self.groups, self.size = {}, 0
+            rows = self.cache.embeddings_since(0)
+        added = {}
+        for _, key, scope, topic, blob in rows:
+            keys, vectors = added.setdefault((scope, topic), ([], []))
+            keys.append(key)
+            vectors.append(np.frombuffer(blob, dtype=np.float32))
+        for group, (keys, vectors) in added.items():
+            old_keys, old_matrix = self.groups.get(group, ([], np.empty((0, len(vectors[0])), np.float32)))
+            self.groups[group] = (old_keys + keys, np.vstack([old_matrix, *vectors]))
+        self.size += len(rows)
+        self.last_id = rows[-1][0]
+
+    def search(self, embedding, scope, topic="", k=SEARCH_CANDIDATES):
+        """`[(key, similarity)]` of the `k` closest stored questions in the group, closest first."""
+        with self.lock:
+            self._sync()
+            keys, matrix = self.groups.get((scope, topic), ([], None))
+        if not keys:
+            return []
+        similarities = matrix @ embedding
+        top = np.argpartition(-similarities, k - 1)[:k] if len(keys) > k else np.arange(len(keys))
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return [(keys[i], float(similarities[i])) for i in top]
+
+
+class SemanticCache:
+    """Embedding lookup in front of the answer cache, with an audit log of every lookup.
+
+    Only questions about the same products (the topic) can match each other:
+    "紅火焰共有多少顆" and "綠橡共有多少顆" embed very closely but need
+    different answers.
+    """
+
+    def __init__(self, cache, embedder=None, threshold=SIMILARITY_THRESHOLD):
+        self.cache = cache
+        # Loaded on the first lookup, so pages that only show the metrics never load the model
+        self.embedder = embedder
+        self.disabled = False
+        self.threshold = threshold
+        self.index = SemanticIndex(cache)
+        with self._connect() as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS semantic_lookups (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "time REAL, question TEXT, matched_question TEXT, similarity REAL, hit INTEGER, "
+                         "saved REAL, flagged INTEGER DEFAULT 0)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.cache.db_path, timeout=5, check_same_thread=False))
+
+    @staticmethod
+    def topic(products) -> str:
+        """Group of questions that may share answers: the embedding model and the products mentioned."""
+        return f"{EMBEDDING_MODEL}|{','.join(sorted(products))}"
+
+    def embed(self, question) -> np.ndarray:
+        if self.embedder is None:
+            self.embedder = _load_embedder(EMBEDDING_MODEL)
+        vector = np.asarray(self.embedder.encode([normalize_question(question)]), dtype=np.float32)[0]
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, question, scope, products=()):
+        """`(hit, embedding)`; `hit` is None or a dict with the stored answer, the
+        question it was given for, the similarity and the audit row id. Both are
+        None when the embedding model can't be loaded."""
+        if self.disabled:
+            return None, None
+        try:
+            embedding = self.embed(question)
+        except Exception:
+            # e.g. the model can't be downloaded on an offline host
+            self.disabled = True
+            return None, None
+        candidates = self.index.search(embedding, scope, self.topic(products))
+        entry, similarity = None, candidates[0][1] if candidates else 0.0
+        for key, candidate_similarity in candidates:
+            if candidate_similarity < self.threshold:
+                break
+            # None once the entry expired or was evicted; the index keeps it until its next rebuild
+            entry = self.cache.get(key)
+            if entry is not None:
+                similarity = candidate_similarity
+                break
+        with self._connect() as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO semantic_lookups (time, question, matched_question, similarity, hit, saved) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), question, entry and entry["question"], similarity, entry is not None,
+                 (entry or {}).get("latency")))
+            conn.execute("DELETE FROM semantic_lookups WHERE id <= ?", (cursor.lastrowid - AUDIT_ROWS,))
+        if entry is None:
+            return None, embedding
+        return dict(entry, similarity=similarity, lookup_id=cursor.lastrowid), embedding
+
+    def flag(self, lookup_id):
+        """Record that a semantic hit answered a different question."""
+        with self._connect() as conn, conn:
+            conn.execute("UPDATE semantic_lookups SET flagged = 1 WHERE id = ?", (lookup_id,))
+
+    def metrics(self) -> dict:
+        """Hit rate, model time saved and reported false hits over the audit log.
+
+        `max_flagged_similarity` is the highest similarity of a reported false
+        hit: a threshold above it would have avoided every report so far.
+        """
+        with self._connect() as conn:
+            lookups, hits, saved, flagged, max_flagged = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit), 0), COALESCE(SUM(saved), 0), COALESCE(SUM(flagged), 0), "
+                "MAX(CASE WHEN flagged THEN similarity END) FROM semantic_lookups").fetchone()
+        return {"lookups": lookups, "hits": hits, "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_seconds": saved, "flagged": flagged, "false_hit_rate": flagged / hits if hits else 0.0,
+                "max_flagged_similarity": max_flagged, "threshold": self.threshold}
+
+
+@st.cache_resource
+def _load_embedder(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+@st.cache_resource
+def get_semantic_cache():
+    """The process-wide semantic cache, or None without sentence-transformers.
+
+    Cheap to get: the embedding model is loaded by the first lookup.
+    """
+    if not HAS_SENTENCE_TRANSFORMERS:
+        return None
+    return SemanticCache(get_answer_cache())
@@ -0,0 +1,219 @@
+import os
+import glob
+import sqlite3
+from contextlib import closing
+import pandas as pd
+import streamlit as st
+from utils import schema
+from utils.frame_cache import CACHE_DIR
+
+# Set CESTLAVIE_STORAGE=sqlite to serve filtered reads from an indexed SQLite copy
+# of the data instead of scanning the in-memory frame
+STORAGE_BACKEND = os.getenv("CESTLAVIE_STORAGE", "pandas")
+TABLE = "products"
+COLUMNS = schema.REQUIRED_COLUMNS + [schema.DAYS_COLUMN]
+INDEXED_COLUMNS = ["產品編號", "產品名稱", "狀態", "種植日期", "採收日期"]
+# Rows per executemany batch while ingesting
+INSERT_ROWS = 50_000
+# Dates are stored as fixed-width ISO text, so string comparison is date order
+SQL_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SQL_TYPES = {"產品編號": "INTEGER", "產品名稱": "TEXT", "種植日期": "TEXT",
+              "採收日期": "TEXT", "狀態": "TEXT", schema.DAYS_COLUMN: "INTEGER"}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_date(value):
+    return pd.Timestamp(value).strftime(SQL_DATE_FORMAT)
+
+
+def _rows(df):
+    """Typed frame → list of insert tuples, converted column-wise."""
+    columns = []
+    for col in COLUMNS:
+        if col in schema.DATE_COLUMNS:
+            columns.append(df[col].dt.strftime(SQL_DATE_FORMAT).tolist())
+        elif col in schema.CATEGORY_COLUMNS:
+            columns.append(df[col].astype(str).tolist())
+        else:
+            columns.append(df[col].tolist())
+    return list(zip(*columns))
+
+
+def _slices(df, rows=INSERT_ROWS):
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows]
+
+
+def build_store(frames, db_path, data_version=None):
+    """Ingest typed frames into a new SQLite file and index it.
+
+    The database is written under a temporary name and moved into place,
+    so readers never see a half-built file. Indexes are created after the
+    bulk insert, which is much faster than maintaining them row by row.
+    """
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with closing(sqlite3.connect(tmp_path)) as conn:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(f"CREATE TABLE {TABLE} ("
+                     + ", ".join(f"{_quote(col)} {_SQL_TYPES[col]}" for col in COLUMNS) + ")")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(COLUMNS))})"
+        for frame in frames:
+            for piece in _slices(frame):
+                conn.executemany(insert, _rows(piece))
+        for i, col in enumerate(INDEXED_COLUMNS):
+            conn.execute(f"CREATE INDEX idx_{i} ON {TABLE} ({_quote(col)})")
+        conn.execute("INSERT INTO meta VALUES ('data_version', ?)", (str(data_version),))
+        conn.execute("ANALYZE")
+        conn.commit()
+    os.replace(tmp_path, db_path)
+    return ProductStore(db_path)
+
+
+def ingest_source(file_paths, db_path, data_version=None):
+    """Stream source files straight into SQLite, one validated chunk at a time.
+
+    Takes one path or a list of partition paths. Never materializes the
+    full table, so it also works for exports larger than RAM.
+    """
+    from utils.data_loader import iter_source_records, _typed_chunk
+
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+
+    def frames():
+        for file_path in file_paths:
+            for records in iter_source_records(file_path):
+                typed, _ = _typed_chunk(pd.DataFrame(records, dtype=object))
+                if not typed.empty:
+                    yield typed
+
+    return build_store(frames(), db_path, data_version)
+
+
+class ProductStore:
+    """Filtered reads over the indexed SQLite copy of the product table.
+
+    Every call opens its own read-only connection, so a store can be shared
+    by all sessions and threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        return closing(sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False))
+
+    def data_version(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _where(products=None, product_id=None, status=None, planted_from=None, harvested_to=None):
+        clauses, params = [], []
+        if products is not None:
+            products = list(products)
+            clauses.append(f'"產品名稱" IN ({", ".join("?" * len(products))})' if products else "0")
+            params += products
+        if product_id is not None:
+            clauses.append('"產品編號" = ?')
+            params.append(int(product_id))
+        if status is not None:
+            clauses.append('"狀態" = ?')
+            params.append(status)
+        if planted_from is not None:
+            clauses.append('"種植日期" >= ?')
+            params.append(_sql_date(planted_from))
+        if harvested_to is not None:
+            clauses.append('"採收日期" <= ?')
+            params.append(_sql_date(harvested_to))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, columns=None, limit=None, **filters) -> pd.DataFrame:
+        """Rows matching the filters, typed and ordered like `load_data()`'s frame.
+
+        Filters: `products` (exact names), `product_id`, `status`,
+        `planted_from`, `harvested_to`.
+        """
+        columns = list(columns or COLUMNS)
+        where, params = self._where(**filters)
+        sql = (f"SELECT {', '.join(map(_quote, columns))} FROM {TABLE}{where} "
+               'ORDER BY "種植日期", "採收日期", rowid')
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        for col in columns:
+            if col in schema.DATE_COLUMNS:
+                df[col] = pd.to_datetime(df[col], format=schema.DATE_FORMAT).astype(schema.SCHEMA[col])
+            elif col in schema.CATEGORY_COLUMNS:
+                df[col] = df[col].astype("category")
+            elif col == schema.DAYS_COLUMN:
+                df[col] = df[col].astype(schema.DAYS_DTYPE)
+            else:
+                df[col] = df[col].astype(schema.SCHEMA[col])
+        return df
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+
+    def value_counts(self, column, **filters) -> pd.Series:
+        """Row counts per value of `column`, largest first."""
+        where, params = self._where(**filters)
+        sql = (f"SELECT {_quote(column)}, COUNT(*) FROM {TABLE}{where} "
+               f"GROUP BY {_quote(column)} ORDER BY COUNT(*) DESC")
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.Series({value: count for value, count in rows}, dtype="int64", name="count")
+
+
+def _store_path(data_version):
+    return os.path.join(CACHE_DIR, f"products-{data_version}.sqlite")
+
+
+@st.cache_resource(max_entries=2)
+def _cached_store(data_version, paths):
+    db_path = _store_path(data_version)
+    store = ProductStore(db_path)
+    try:
+        if os.path.exists(db_path) and store.data_version() == str(data_version):
+            return store
+    except sqlite3.DatabaseError:
+        pass
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Built from the source files, not the loaded frame, so no second in-memory copy is made
+    store = ingest_source(list(paths), db_path, data_version)
+    for old_path in glob.glob(os.path.join(CACHE_DIR, "products-*.sqlite")):
+        if old_path != db_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return store
+
+
+def get_store(df: pd.DataFrame):
+    """The SQLite store for `df` when CESTLAVIE_STORAGE=sqlite, else None.
+
+    Ingested from the source files once per data version and shared by all
+    sessions; a failed build falls back to the in-memory frame.
+    """
+    if STORAGE_BACKEND != "sqlite":
+        return None
+    from utils.data_loader import DATA_PATH, discover_partitions
+
+    paths = discover_partitions(DATA_PATH) if os.path.isdir(DATA_PATH) else [DATA_PATH]
+    try:
+        return _cached_store(df.attrs.get("data_version"), tuple(paths))
+    except (OSError, ValueError, KeyError, sqlite3.Error):
+        return None
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.schema import DAYS_COLUMN
+from utils.sketches import planting_month, hll_registers, merge_hll, distinct_ids, quantiles, HLL_ERROR
+
+# Dataset statistics are kept as exact count tables keyed by product. Counts
+# are additive, so tables from partitions or appended rows merge by addition,
+# removed rows merge by subtraction, and every summary figure (count, mean,
+# std, min/max, quantiles, date and id ranges, status mix) is derived from
+# them without touching the rows again. Growing days are small integers, so the
+# per-month day histograms are an exact quantile sketch of bounded size.
+# Distinct 產品編號 per product and month come from HyperLogLog registers
+# (utils/sketches.py), which merge by element-wise max.
+TABLES = {
+    "days": ["產品名稱", "狀態", DAYS_COLUMN],
+    "monthly": ["產品名稱", "種植月", DAYS_COLUMN],
+    "planted": ["產品名稱", "種植日期"],
+    "harvested": ["產品名稱", "採收日期"],
+    "ids": ["產品名稱", "產品編號"],
+}
+
+
+def compute_stats(df: pd.DataFrame, weights=None) -> dict:
+    """Count tables for `df`; `weights` (one per row, may be negative) replace the row count of 1.
+
+    Rows with negative weights can't be removed from HyperLogLog registers,
+    so `id_hll` is None in that case and the caller rebuilds it.
+    """
+    weight = pd.Series(1 if weights is None else np.asarray(weights, dtype=np.int64),
+                       index=df.index, dtype=np.int64)
+    columns = {key: df[key] for keys in TABLES.values() for key in keys if key in df.columns}
+    columns["種植月"] = pd.Series(planting_month(df), index=df.index)
+    stats = {}
+    for name, keys in TABLES.items():
+        counts = weight.groupby([columns[key] for key in keys], observed=True, sort=False).sum()
+        # Plain (non-categorical) levels so tables built from different frames align on merge
+        counts.index = pd.MultiIndex.from_arrays(
+            [counts.index.get_level_values(i).astype(str) if key in ("產品名稱", "狀態")
+             else counts.index.get_level_values(i) for i, key in enumerate(keys)], names=keys)
+        stats[name] = counts[counts != 0]
+    stats["id_hll"] = hll_registers(df[weight.to_numpy() > 0]) if (weight >= 0).all() else None
+    return stats
+
+
+def merge_stats(*parts) -> dict:
+    """Sum count tables (e.g. one per partition, or a base plus a signed delta) and union the registers."""
+    parts = [part for part in parts if part is not None]
+    stats = {}
+    for name in TABLES:
+        tables = [part[name] for part in parts if len(part[name])]
+        if not tables:
+            stats[name] = parts[0][name] if parts else pd.Series(dtype=np.int64)
+            continue
+        merged = pd.concat(tables).groupby(level=list(range(len(TABLES[name]))), sort=False).sum()
+        stats[name] = merged[merged != 0].astype(np.int64)
+    stats["id_hll"] = merge_hll(*(part.get("id_hll") for part in parts))
+    return stats
+
+
+def _select(table, products):
+    if products is None:
+        return table
+    return table[table.index.get_level_values("產品名稱").isin(products)]
+
+
+def _collapse(table, level):
+    """Counts per value of one level, summed over the others, in value order."""
+    return table.groupby(level=level).sum().sort_index()
+
+
+def _day_figures(days):
+    values = days.index.to_numpy(dtype=np.float64)
+    weights = days.to_numpy(dtype=np.float64)
+    total = weights.sum()
+    mean = (values * weights).sum() / total
+    std = np.sqrt(max((values * values * weights).sum() / total - mean * mean, 0.0))
+    q1, median, q3 = quantiles(days, [0.25, 0.5, 0.75])
+    return {"mean": mean, "std": std, "min": days.index[0], "median": median,
+            "q1": q1, "q3": q3, "max": days.index[-1], "mode": days.idxmax()}
+
+
+def _date(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def month_days(stats: dict, start=None, end=None) -> pd.DataFrame:
+    """Growing-day counts per product (columns: days) for plantings in [start, end] months."""
+    table = stats["monthly"]
+    month = table.index.get_level_values("種植月")
+    mask = np.ones(len(table), dtype=bool)
+    if start is not None:
+        mask &= month >= pd.Timestamp(start).to_period("M").to_timestamp()
+    if end is not None:
+        mask &= month <= pd.Timestamp(end).to_period("M").to_timestamp()
+    return table[mask].groupby(level=["產品名稱", DAYS_COLUMN]).sum()
+
+
+def summarize(stats: dict, products=None, max_lines: int = 40) -> str:
+    """Compact text summary for LLM context, optionally restricted to `products`."""
+    days_table = _select(stats["days"], products)
+    if days_table.empty:
+        return ""
+    days = _collapse(days_table, DAYS_COLUMN)
+    planted = _collapse(_select(stats["planted"], products), "種植日期")
+    harvested = _collapse(_select(stats["harvested"], products), "採收日期")
+    ids = _collapse(_select(stats["ids"], products), "產品編號")
+    statuses = _collapse(days_table, "狀態").sort_values(ascending=False)
+    per_product = _collapse(days_table, "產品名稱").sort_values(ascending=False)
+    figures = _day_figures(days)
+
+    lines = [
+        f"資料筆數：{int(days.sum())}（產品 {len(per_product)} 種）",
+        f"種植日期：{_date(planted.index[0])} ～ {_date(planted.index[-1])}",
+        f"採收日期：{_date(harvested.index[0])} ～ {_date(harvested.index[-1])}",
+        f"產品編號：{ids.index[0]} ～ {ids.index[-1]}（{len(ids)} 個不同編號）",
+        f"種植時間（日）：平均 {figures['mean']:.1f}，標準差 {figures['std']:.1f}，最短 {figures['min']}，"
+        f"25% {figures['q1']}，中位數 {figures['median']}，75% {figures['q3']}，最長 {figures['max']}，"
+        f"最常見 {figures['mode']}",
+        "狀態：" + "、".join(f"{status} {count}" for status, count in statuses.items()),
+        f"各產品筆數（種植時間平均／中位數，不同產品編號數為 HyperLogLog 估計，標準誤差約 ±{HLL_ERROR:.1%}）：",
+    ]
+    days_by_product = days_table.groupby(level=["產品名稱", DAYS_COLUMN]).sum()
+    id_counts = distinct_ids(stats.get("id_hll"), products=products)
+    for name, count in per_product.items():
+        if len(lines) >= max_lines:
+            lines.append(f"…其餘 {len(per_product) - (len(lines) - 7)} 種產品省略")
+            break
+        product_days = days_by_product.xs(name, level="產品名稱").sort_index()
+        mean = (product_days.index.to_numpy() * product_days.to_numpy()).sum() / count
+        median = quantiles(product_days, [0.5])[0]
+        ids_text = f"，約 {id_counts[name]} 個編號" if name in id_counts.index else ""
+        lines.append(f"- {name}：{count} 筆（{mean:.1f}／{median} 天{ids_text}）")
+    return "\n".join(lines)
+
+
+@st.cache_resource(max_entries=2)
+def _cached_stats(data_version, _df):
+    return compute_stats(_df)
+
+
+def get_stats(df: pd.DataFrame) -> dict:
+    """Statistics for `df`, maintained incrementally by the loader or computed once per data version."""
+    from utils.data_loader import dataset_stats
+    stats = dataset_stats(df)
+    return stats if stats is not None else _cached_stats(df.attrs.get("data_version"), df)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+import streamlit as st
+from utils.frame_cache import CACHE_DIR
+
+# A streamed answer is redrawn at most once per frame, or sooner after this many deltas
+FRAME_SECONDS = 0.05
+FRAME_TOKENS = 32
+# One JSON line per model answer; the last RECENT_METRICS are also kept in memory
+METRICS_LOG = os.getenv("CESTLAVIE_CHAT_METRICS_LOG") or os.path.join(CACHE_DIR, "chat_metrics.jsonl")
+RECENT_METRICS = 200
+
+
+class StreamRenderer:
+    """Coalesces streamed deltas into one placeholder update per frame.
+
+    Each update still sends the whole answer (a Streamlit element is replaced,
+    not appended to), so the cost is in the number of updates: batching keeps
+    it to about `latency / FRAME_SECONDS` instead of one per token. Deltas are
+    buffered and joined once per frame, not once per delta.
+    """
+
+    def __init__(self, placeholder, frame_seconds=FRAME_SECONDS, frame_tokens=FRAME_TOKENS, started=None):
+        self.placeholder = placeholder
+        self.frame_seconds = frame_seconds
+        self.frame_tokens = frame_tokens
+        self.started = started if started is not None else time.perf_counter()
+        self.first_token = None
+        self.finished = None
+        self.text = ""
+        self.pending = []
+        self.tokens = 0
+        self.frames = 0
+        self.last_frame = self.started
+
+    def feed(self, delta: str):
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        self.pending.append(delta)
+        self.tokens += 1
+        # The first delta is drawn at once, so time-to-first-token is also time-to-first-paint
+        if self.frames == 0 or len(self.pending) >= self.frame_tokens or now - self.last_frame >= self.frame_seconds:
+            self._flush(now)
+
+    def _flush(self, now):
+        if self.pending:
+            self.text += "".join(self.pending)
+            self.pending.clear()
+        self.placeholder.markdown(self.text)
+        self.frames += 1
+        self.last_frame = now
+
+    def finish(self, final_text=None, output_tokens=None) -> dict:
+        """Draw the final answer and return the timing metrics of the response."""
+        self.finished = time.perf_counter()
+        if final_text is not None:
+            self.text, self.pending = final_text, []
+        self._flush(self.finished)
+        if output_tokens:
+            self.tokens = output_tokens
+        return self.metrics()
+
+    def metrics(self) -> dict:
+        end = self.finished or time.perf_counter()
+        ttft = None if self.first_token is None else self.first_token - self.started
+        generating = end - self.first_token if self.first_token is not None else 0.0
+        return {
+            "ttft": ttft,
+            "latency": end - self.started,
+            "tokens": self.tokens,
+            # Rate after the first token, so queueing and prompt processing don't dilute it
+            "tokens_per_second": self.tokens / generating if generating > 0 else None,
+            "frames": self.frames,
+        }
+
+
+class MetricsLog:
+    """Per-answer metrics: appended to a JSON-lines file and kept in memory for the debug panel."""
+
+    def __init__(self, path=METRICS_LOG, keep=RECENT_METRICS):
+        self.path = path
+        self.recent = deque(maxlen=keep)
+        self.lock = threading.Lock()
+
+    def record(self, entry: dict):
+        entry = {"time": time.time(), **entry}
+        with self.lock:
+            self.recent.append(entry)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError:
+                pass  # the log is diagnostics only
+
+    def summary(self) -> dict:
+        """Median / p95 time-to-first-token and latency, median tokens/sec over the recent answers."""
+        with self.lock:
+            entries = list(self.recent)
+
+        def values(name):
+            return np.array([e[name] for e in entries if e.get(name) is not None], dtype=float)
+
+        ttft, latency, rate = values("ttft"), values("latency"), values("tokens_per_second")
+        return {
+            "count": len(entries),
+            "ttft_p50": float(np.median(ttft)) if len(ttft) else None,
+            "ttft_p95": float(np.percentile(ttft, 95)) if len(ttft) else None,
+            "latency_p50": float(np.median(latency)) if len(latency) else None,
+            "latency_p95": float(np.percentile(latency, 95)) if len(latency) else None,
+            "tokens_per_second_p50": float(np.median(rate)) if len(rate) else None,
+            "last": entries[-1] if entries else None,
+        }
+
+
+@st.cache_resource
+def get_metrics_log() -> MetricsLog:
+    """The process-wide metrics log, shared by all sessions."""
+    return MetricsLog()
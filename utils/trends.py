@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Points drawn per series; about one per pixel column of a 10-inch figure at 150 dpi
+TREND_POINTS = 1500
+# WebGL traces stay smooth with far more points, which keeps detail when zooming in the browser
+INTERACTIVE_POINTS = 20_000
+FREQUENCIES = {"日": "D", "週": "W-MON"}
+
+
+def event_series(stats: dict, event: str, start, end, freq="D", products=None) -> pd.Series:
+    """Plantings (`event="planted"`) or harvests (`"harvested"`) per period within [start, end].
+
+    Resampled from the per-day count tables, so the cost depends on the
+    number of days, not rows. Empty periods are zero-filled.
+    """
+    table = stats[event]
+    if products:
+        table = table[table.index.get_level_values("產品名稱").isin(products)]
+    per_day = table.groupby(level=1).sum()
+    per_day.index = pd.DatetimeIndex(per_day.index)
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    per_day = per_day[(per_day.index >= start) & (per_day.index <= end)]
+    days = pd.date_range(start, end, freq="D")
+    per_day = per_day.reindex(days, fill_value=0)
+    if freq == "D":
+        return per_day
+    return per_day.resample(freq, label="left", closed="left").sum()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """Largest-Triangle-Three-Buckets downsampling to `threshold` points.
+
+    Keeps the first and last points and, per bucket, the point forming the
+    largest triangle with the previous pick and the next bucket's mean, so
+    peaks and troughs survive.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = xf[next_lo:next_hi].mean()
+        mean_y = yf[next_lo:next_hi].mean()
+        area = np.abs((xf[prev] - mean_x) * (yf[lo:hi] - yf[prev])
+                      - (xf[prev] - xf[lo:hi]) * (mean_y - yf[prev]))
+        prev = lo + int(area.argmax())
+        picked[i + 1] = prev
+    return x[picked], y[picked]
+
+
+def downsample(series: pd.Series, points: int = TREND_POINTS) -> pd.Series:
+    """Shape-preserving downsampling of a date-indexed series to at most `points` points."""
+    if len(series) <= points:
+        return series
+    x = series.index.asi8
+    x_kept, y_kept = lttb(x, series.to_numpy(), points)
+    # asi8 is in the index's own unit (ns, or us for pandas 3 date ranges), so convert back in that unit
+    return pd.Series(y_kept, index=pd.DatetimeIndex(x_kept.astype(series.index.to_numpy().dtype)), name=series.name)
+
+
+def status_mix(cells: pd.DataFrame) -> pd.DataFrame:
+    """Share of each status per planting month, from cube cells (rows: months, columns: statuses)."""
+    counts = cells.groupby(["種植月", "狀態"], observed=True)["count"].sum().unstack(fill_value=0)
+    counts = counts[counts.sum().sort_values(ascending=False).index]
+    return counts.div(counts.sum(axis=1), axis=0)
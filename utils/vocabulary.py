@@ -0,0 +1,15 @@
+# 所有產品名稱（來自你圖片）
+product_list = [
+    "奶油波士頓", "奶波", "玉芙蓉", "冰花", "貝比萵", "紅火焰", "紅奶油",
+    "紅狐", "紅彤", "紅橙", "紅甜脆", "紅芽心", "紅綠",
+    "英貝比萵", "英貝比萵(不分品種)", "恐龍甘藍", "恐龍羽衣甘藍", "粉嫩天使",
+    "捲葉甘藍", "捲葉羽衣甘藍", "菊苣", "試種", "綠水晶", "綠火焰",
+    "綠狐", "綠甜脆", "綠橡","綠蘿蔓","綠寶石"
+]
+
+question_list = [ "產品名稱","產品編號", "種植日期", "採收日期", "狀態","多少顆","多少斤","多少公斤",
+                 "多少公克","多少片","多少株","多少棵","多少株數","多少片數","多少斤數","多少公斤數","多少公克數",
+                 "最多","最少","平均","中位數","標準差","變異數","最大值","最小值",
+                 "總和","總計","總數","總量","總重量","總斤數","總公斤數","總公克數",
+                 "價格","單價","售價"
+]